@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Benchmarks of the geometry and G-code pipeline.
+#
+#   ./benchmark.py run -o results.json
+#   ./benchmark.py compare base.json results.json
+import argparse, json, os, platform, statistics, subprocess, sys, tempfile, time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'pywing'))
+import fixtures
+
+default_sizes = (200, 1000, 5000)
+
+class Benchmark():
+    def __init__(self, name, setup, sizes):
+        self.name = name
+        self.setup = setup # setup(size) returns the function to time
+        self.sizes = sizes
+
+benchmarks = list()
+cleanups = list() # called once all benchmarks have run
+
+def benchmark(name, sizes=None):
+    def register(setup):
+        benchmarks.append(Benchmark(name, setup, sizes))
+        return setup
+    return register
+
+def airfoil_gen(n):
+    from airfoilloader import AirfoilLoader
+    return AirfoilLoader.load(fixtures.write_airfoil(tmp_dir, n))
+
+@benchmark('AirfoilLoader.load')
+def bench_airfoil_load(n):
+    from airfoilloader import AirfoilLoader
+    filename = fixtures.write_airfoil(tmp_dir, n)
+    return lambda: AirfoilLoader.load(filename)
+
+@benchmark('DXFLoader.load')
+def bench_dxf_load(n):
+    from dxfloader import DXFLoader
+    filename = fixtures.write_dxf(tmp_dir, n)
+    return lambda: DXFLoader.load(filename)
+
+@benchmark('SVGLoader.load')
+def bench_svg_load(n):
+    from svgloader import SVGLoader
+    filename = fixtures.write_svg(tmp_dir, n // 10)
+    return lambda: SVGLoader.load(filename)
+
+@benchmark('PathGenerator.generate')
+def bench_generate(n):
+    gen = airfoil_gen(n)
+    return gen.generate
+
+@benchmark('PathGenerator.slice')
+def bench_slice(n):
+    gen = airfoil_gen(n)
+    degrees = np.sort(np.random.RandomState(0).uniform(0.0, 1.0, n))
+    return lambda: gen.copy().slice(degrees)
+
+@benchmark('PathGenerator.synchronize')
+def bench_synchronize(n):
+    from pathgenerator import PathGenerator
+    a = airfoil_gen(n)
+    b = airfoil_gen(n // 2 + 1)
+    return lambda: PathGenerator.synchronize(a, b)
+
+@benchmark('PathGenerator.close_to')
+def bench_close_to(n):
+    gen = airfoil_gen(n)
+    return lambda: gen.close_to((-50.0, 3.0))
+
+@benchmark('path.transform')
+def bench_transform(n):
+    import path
+    points = airfoil_gen(n).generate()
+    tr_mat = path.transform_matrix(2.0, 5.0, (0.0, 0.0))
+    return lambda: path.with_leads(path.transform(path.kerf(points, 0.5 / 2.0), tr_mat), 10.0)
+
+@benchmark('CutProcessor.generate_gcode')
+def bench_generate_gcode(n):
+    # program is cached between calls, it is computed again on each one
+    cut_proc = cut_processor(airfoil_gen(n), airfoil_gen(n))
+    def generate():
+        cut_proc._program_graph.clear()
+        return cut_proc.generate_gcode()
+    return generate
+
+@benchmark('gcode.format_program')
+def bench_format_program(n):
+    import gcode
+    positions, feeds, index = cut_processor(airfoil_gen(n), airfoil_gen(n)).get_program()
+    return lambda: gcode.format_program(positions, feeds, 200.0)
+
+@benchmark('SerialThread.stream')
+def bench_stream(n):
+    # stream n lines to the Grbl simulator with instantaneous motion
+    from PyQt5 import QtCore
+    from machine import MachineModel, SerialThread
+    from grblsim import GrblSimulator
+    sim = GrblSimulator(speed=1e6)
+    thread = SerialThread(MachineModel())
+    thread.start()
+    thread.connect(sim.open_pty())
+    cleanups.append(lambda: (thread.shutdown(), thread.wait(), sim.close()))
+    start = time.time()
+    while not thread.connected:
+        if time.time() - start > 5.0:
+            raise RuntimeError('cannot connect to simulator')
+        time.sleep(0.01)
+    program = ''.join('G01 F%.3f X%.3f Y%.3f U%.3f V%.3f\n' % (200 + i % 7, i, -i, i / 2, -i / 2) for i in range(n))
+    def stream():
+        thread.play(program)
+        while thread.running or thread.bytes_in_flight:
+            time.sleep(0.0005)
+    return stream
+
+def cut_processor(gen_l, gen_r):
+    from pywing import CutProcessor, MachineModel, PathManager, PositionModel, FoamBlockModel, CutParametersModel
+    machine = MachineModel()
+    managers = list()
+    for gen in (gen_l, gen_r):
+        pm = PathManager((0, 0, 0))
+        pm.gen = pm.shift_gen = pm.sync_gen = gen
+        pm.loaded = True
+        managers.append(pm)
+    cut_proc = CutProcessor(machine, managers[0], managers[1], PositionModel('Absolute'),
+                            PositionModel('Relative'), FoamBlockModel(machine), CutParametersModel(),
+                            threaded=False)
+    cut_proc._request()
+    return cut_proc
+
+def measure(function, repeat):
+    times = list()
+    for i in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return {'min':min(times), 'median':statistics.median(times), 'repeat':repeat}
+
+def metadata():
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL,
+                                         cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except Exception:
+        commit = None
+    return {'date':time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'commit':commit,
+            'python':platform.python_version(),
+            'numpy':np.__version__,
+            'machine':platform.machine(),
+            'platform':platform.platform()}
+
+def run(args):
+    global tmp_dir
+    results = dict()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for b in benchmarks:
+            if args.filter and not any(f in b.name for f in args.filter):
+                continue
+            for size in (b.sizes or args.sizes):
+                key = '%s[%d]' % (b.name, size)
+                try:
+                    function = b.setup(size)
+                    function() # warm up caches and lazy imports
+                    results[key] = measure(function, args.repeat)
+                    print('%-40s %10.3f ms' % (key, results[key]['min'] * 1e3))
+                except ImportError as e:
+                    print('%-40s skipped (%s)' % (key, e))
+                except Exception as e:
+                    print('%-40s failed (%s: %s)' % (key, type(e).__name__, e))
+                sys.stdout.flush()
+        for cleanup in cleanups:
+            cleanup()
+
+    output = {'metadata':metadata(), 'results':results}
+    if args.output:
+        fp = open(args.output, 'w')
+        json.dump(output, fp, indent=2)
+        fp.close()
+
+def compare(args):
+    base = json.load(open(args.base))['results']
+    new = json.load(open(args.new))['results']
+    regressions = 0
+    for key in sorted(set(base) & set(new)):
+        ratio = new[key]['min'] / base[key]['min']
+        if ratio > 1.0 + args.threshold:
+            flag = 'REGRESSION'
+            regressions += 1
+        elif ratio < 1.0 / (1.0 + args.threshold):
+            flag = 'improvement'
+        else:
+            flag = ''
+        print('%-40s %10.3f ms %10.3f ms %7.2fx %s' % (key, base[key]['min'] * 1e3, new[key]['min'] * 1e3, ratio, flag))
+    for key in sorted(set(base) ^ set(new)):
+        print('%-40s only in %s' % (key, args.base if key in base else args.new))
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='pywing benchmarks')
+    subparsers = parser.add_subparsers(dest='command')
+    run_parser = subparsers.add_parser('run', help='run benchmarks')
+    run_parser.add_argument('-o', '--output', help='JSON result file')
+    run_parser.add_argument('-r', '--repeat', type=int, default=5)
+    run_parser.add_argument('-s', '--sizes', type=int, nargs='+', default=default_sizes)
+    run_parser.add_argument('-k', '--filter', nargs='+', help='only run benchmarks whose name contains one of these')
+    compare_parser = subparsers.add_parser('compare', help='compare two result files')
+    compare_parser.add_argument('base')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('-t', '--threshold', type=float, default=0.2, help='relative slowdown flagged as regression')
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        run(args)
+    elif args.command == 'compare':
+        sys.exit(compare(args))
+    else:
+        parser.print_help()
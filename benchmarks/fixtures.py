@@ -0,0 +1,57 @@
+import numpy as np
+import os
+
+# Deterministic synthetic inputs for benchmarks, written in the formats
+# read by pywing loaders.
+
+def naca_points(n, code='2412'):
+    # closed 4-digit NACA profile with n points, cosine spacing
+    m, p, t = int(code[0]) / 100, int(code[1]) / 10, int(code[2:]) / 100
+    beta = np.linspace(0.0, np.pi, n // 2 + 1)
+    x = (1 - np.cos(beta)) / 2
+    yt = 5 * t * (0.2969 * np.sqrt(x) - 0.1260 * x - 0.3516 * x**2 + 0.2843 * x**3 - 0.1015 * x**4)
+    if m > 0:
+        yc = np.where(x < p, m / p**2 * (2 * p * x - x**2), m / (1 - p)**2 * ((1 - 2 * p) + 2 * p * x - x**2))
+    else:
+        yc = np.zeros_like(x)
+    xs = np.concatenate((x[::-1], x[1:]))
+    ys = np.concatenate(((yc + yt)[::-1], (yc - yt)[1:]))
+    return np.vstack((xs, ys))
+
+def write_airfoil(directory, n):
+    filename = os.path.join(directory, 'naca2412_%d.dat' % n)
+    points = naca_points(n)
+    fp = open(filename, 'w')
+    fp.write('NACA 2412 %d points\n' % n)
+    for x, y in points.transpose():
+        fp.write('%.7f %.7f\n' % (x, y))
+    fp.close()
+    return filename
+
+def write_dxf(directory, n):
+    import ezdxf
+    filename = os.path.join(directory, 'polyline_%d.dxf' % n)
+    points = naca_points(n) * 200
+    dwg = ezdxf.new()
+    dwg.modelspace().add_lwpolyline([tuple(p) for p in points.transpose()])
+    dwg.saveas(filename)
+    return filename
+
+def write_svg(directory, n):
+    # one path made of n cubic Bezier segments along a wavy closed outline
+    filename = os.path.join(directory, 'bezier_%d.svg' % n)
+    angle = np.linspace(0.0, 2 * np.pi, n + 1)
+    radius = 300 + 40 * np.sin(7 * angle)
+    points = np.vstack((radius * np.cos(angle), radius * np.sin(angle))) + 400
+    tangent = np.vstack((-np.sin(angle), np.cos(angle))) * radius * (2 * np.pi / n) / 3
+    d = 'M %.4f %.4f' % tuple(points[:, 0])
+    for i in range(n):
+        c1 = points[:, i] + tangent[:, i]
+        c2 = points[:, i+1] - tangent[:, i+1]
+        d += ' C %.4f %.4f %.4f %.4f %.4f %.4f' % (tuple(c1) + tuple(c2) + tuple(points[:, i+1]))
+    fp = open(filename, 'w')
+    fp.write('<svg xmlns="http://www.w3.org/2000/svg" width="800" height="800">\n')
+    fp.write('<path d="%s" fill="none" stroke="black"/>\n' % d)
+    fp.write('</svg>\n')
+    fp.close()
+    return filename
@@ -3,6 +3,7 @@ from PyQt5 import QtCore, QtGui, Qt
 class CutParametersModel(QtCore.QObject):
     update = QtCore.pyqtSignal()
     reset  = QtCore.pyqtSignal()
+    feedrate_update = QtCore.pyqtSignal()
 
     def __init__(self):
         super().__init__()
@@ -22,7 +23,8 @@ class CutParametersModel(QtCore.QObject):
 
     def set_feedrate(self, f):
         self.feedrate = f
-        # feedrate change doesn't need to emit signal
+        # feedrate change doesn't need paths to be updated
+        self.feedrate_update.emit()
 
 class CutParametersWidget(QtGui.QWidget):
     def __init__(self, cut_param_model):
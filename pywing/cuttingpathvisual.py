@@ -1,5 +1,5 @@
 import numpy as np
-from vispy import visuals, gloo, geometry, color as clr, ext
+from vispy import visuals, gloo, color as clr
 
 shading_vertex_template = """
 varying out vec3 v_position;
@@ -19,7 +19,7 @@ layout(lines_adjacency) in;
 layout(triangle_strip, max_vertices = 52) out;
 
 void main(void) {
-    int n = 25;
+    int n = $n_segments;
 
     vec3 v_normal_vec[4];
     v_normal_vec[0] = normalize(cross(v_position[1]-v_position[0], v_position[2]-v_position[0]));
@@ -91,7 +91,12 @@ void main() {
 """
 
 class CuttingPathVisual(visuals.Visual):
-    def __init__(self, vertices=None, faces=None, color=(0.5, 0.5, 1, 1), **kwargs):
+    # Surface swept by the wire between synced left and right paths (3xN).
+    # Vertices live in a persistent float32 array split in two halves, left
+    # path at 0 and right path at half capacity, so that a change of point
+    # count does not move right vertices. Capacity grows geometrically and
+    # only the range of points that changed is uploaded.
+    def __init__(self, path_l=None, path_r=None, color=(0.5, 0.5, 1, 1), **kwargs):
         visuals.Visual.__init__(self, vcode=shading_vertex_template,
                                       fcode=shading_fragment_template,
                                       gcode=shading_geometry_template,
@@ -102,47 +107,89 @@ class CuttingPathVisual(visuals.Visual):
         self._draw_mode = 'lines_adjacency'
 
         # Define buffers
-        self.vv = None
-        self._vertices = gloo.VertexBuffer(np.zeros((0, 3), dtype=np.float32))
+        self._half = 0
+        self._n = 0
+        self._vdata = np.zeros((0, 3), dtype=np.float32)
+        self._vertices = gloo.VertexBuffer(self._vdata)
         self._faces = gloo.IndexBuffer()
+        self._uploads = []
+        self._resized = False
         self._color = clr.Color(color)
+        self._n_segments = 25
 
         # Init
         self._bounds = None
 
         # Note we do not call subclass set_data -- often the signatures
         # do no match.
-        CuttingPathVisual.set_data(self, vertices=vertices, faces=faces)
+        CuttingPathVisual.set_data(self, path_l=path_l, path_r=path_r)
 
         self.freeze()
 
-
-    def set_data(self, vertices=None, faces=None):
-        if vertices is not None:
-            self.vv = np.ascontiguousarray(vertices)
-        else:
-            self.vv = None
-
-        self.ff = faces
-
-        meshdata = geometry.MeshData(vertices=vertices, faces=faces)
-        self._bounds = meshdata.get_bounds()
+    def set_data(self, path_l=None, path_r=None):
+        if path_l is None or path_r is None or np.size(path_l, 1) < 2:
+            self._n = 0
+            self._bounds = None
+            self._data_changed = True
+            self.update()
+            return
+
+        n = np.size(path_l, 1)
+        if n > self._half:
+            self._half = max(n, 2 * self._half, 64)
+            self._vdata = np.zeros((2 * self._half, 3), dtype=np.float32)
+            self._resized = True
+
+        for offset, path in ((0, path_l), (self._half, path_r)):
+            new = path.transpose().astype(np.float32)
+            old = self._vdata[offset:offset + n]
+            changed = np.flatnonzero(np.any(old != new, axis=1))
+            if changed.size > 0:
+                lo, hi = offset + changed[0], offset + changed[-1] + 1
+                self._vdata[lo:hi] = new[changed[0]:changed[-1] + 1]
+                self._uploads.append((lo, hi))
+
+        if n != self._n:
+            self._n = n
+            self._faces.set_data(CuttingPathVisual.faces(n, self._half))
+
+        low = np.minimum(np.amin(path_l, axis=1), np.amin(path_r, axis=1))
+        high = np.maximum(np.amax(path_l, axis=1), np.amax(path_r, axis=1))
+        self._bounds = list(zip(low, high))
 
         self._data_changed = True
         self.update()
 
-    def _update_data(self):
+    def faces(n, half):
+        # lines adjacency quads: left i, right i, left i+1, right i+1
+        i = np.arange(n - 1, dtype=np.uint32)
+        return np.stack((i, i + half, i + 1, i + 1 + half), axis=1).ravel()
+
+    def set_segments(self, n):
+        # number of strips along the wire, at most 25 (max_vertices = 52)
+        n = int(min(max(n, 2), 25))
+        if n != self._n_segments:
+            self._n_segments = n
+            self.shared_program.geom['n_segments'] = n
+            self.update()
 
-        if self.vv is None:
+    def _update_data(self):
+        if self._n == 0:
             return False
 
-        self._vertices.set_data(self.vv, convert=True)
-        self._faces.set_data(self.ff, convert=True)
+        if self._resized:
+            self._vertices.set_data(self._vdata)
+            self._resized = False
+        else:
+            for lo, hi in self._uploads:
+                self._vertices.set_subdata(self._vdata[lo:hi], offset=lo, copy=True)
+        self._uploads = []
         self._index_buffer = self._faces
 
         self.shared_program.vert['position'] = self._vertices
         self.shared_program.frag['base_color'] = self._color.rgba
         self.shared_program.frag['ambientk'] = [0.3, 0.3, 0.3, 1.0]
+        self.shared_program.geom['n_segments'] = self._n_segments
         self._data_changed = False
 
     def _prepare_draw(self, view):
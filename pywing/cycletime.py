@@ -0,0 +1,66 @@
+import numpy as np
+from gcode import tower_distances
+
+# Cycle time of a program, simulated the way Grbl plans moves: feedrate
+# clamped by axis max velocities, trapezoidal profiles with axis limited
+# acceleration, junction speeds from junction deviation, and entry speeds
+# given by backward/forward planner passes. Both passes are computed in
+# closed form as running minima so the whole program is vectorized.
+
+def estimate(positions, feeds, max_velocity, max_acceleration, junction_deviation, sections=None):
+    # positions: 4xN (mm), feeds: N-1 (mm/min), max_velocity: 4 axes (mm/min),
+    # max_acceleration: 4 axes (mm/s^2), junction_deviation (mm),
+    # sections: list of (name, first move, end move)
+    delta = np.diff(positions, axis=1)
+    length = np.maximum(*tower_distances(delta))
+    moving = length > 0.0
+    delta, length, feeds = delta[:, moving], length[moving], np.asarray(feeds)[moving]
+    move_idx = np.flatnonzero(moving)
+    if length.size == 0:
+        return {'total':0.0, 'sections':{}, 'feed_limited':0.0, 'move_times':np.zeros(np.size(positions, 1) - 1)}
+
+    # axis displacement per mm of feed length
+    axis_ratio = np.abs(delta) / length
+    with np.errstate(divide='ignore'):
+        velocity_limit = np.min(np.reshape(max_velocity, (4, 1)) / axis_ratio, axis=0)
+        accel = np.min(np.reshape(max_acceleration, (4, 1)) / axis_ratio, axis=0)
+    nominal = np.minimum(feeds, velocity_limit) / 60.0
+    feed_limited = feeds <= velocity_limit
+
+    # junction speed limit between consecutive moves
+    unit = delta / np.linalg.norm(delta, axis=0)
+    cos_theta = np.clip(-np.sum(unit[:, :-1] * unit[:, 1:], axis=0), -1.0, 1.0)
+    sin_half = np.sqrt(0.5 * (1.0 - cos_theta))
+    junction_accel = np.minimum(accel[:-1], accel[1:])
+    with np.errstate(divide='ignore'):
+        junction2 = np.where(sin_half < 1.0 - 1e-9,
+                             junction_accel * junction_deviation * sin_half / (1.0 - sin_half), np.inf)
+    junction2 = np.minimum(junction2, np.minimum(nominal[:-1], nominal[1:])**2)
+    limit2 = np.concatenate(([0.0], junction2, [0.0]))
+
+    # v2[i] = min(limit2[i], v2[i+1] + 2 a L) backward, then the same forward,
+    # with s the cumulated 2 a L both are running minima
+    s = np.concatenate(([0.0], np.cumsum(2.0 * accel * length)))
+    v2 = np.minimum.accumulate((limit2 + s)[::-1])[::-1] - s
+    v2 = np.minimum.accumulate(v2 - s) + s
+    v2 = np.maximum(v2, 0.0)
+
+    # trapezoidal or triangular profile of each move
+    v0, v1 = np.sqrt(v2[:-1]), np.sqrt(v2[1:])
+    peak = np.sqrt((2.0 * accel * length + v2[:-1] + v2[1:]) / 2.0)
+    cruise = peak >= nominal
+    top = np.where(cruise, nominal, peak)
+    ramp_length = (2.0 * top**2 - v2[:-1] - v2[1:]) / (2.0 * accel)
+    cruise_time = np.where(cruise, np.maximum(length - ramp_length, 0.0) / nominal, 0.0)
+    times = (2.0 * top - v0 - v1) / accel + cruise_time
+
+    move_times = np.zeros(np.size(positions, 1) - 1)
+    move_times[move_idx] = times
+    total = float(np.sum(times))
+    result = {'total':total,
+              'sections':{},
+              'feed_limited':float(np.sum(cruise_time[feed_limited]) / total) if total > 0 else 0.0,
+              'move_times':move_times}
+    for name, start, end in (sections or []):
+        result['sections'][name] = float(np.sum(move_times[start:end]))
+    return result
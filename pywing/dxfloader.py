@@ -36,7 +36,7 @@ class DXFLoader():
                     if(abs(vertex[n][0] - vertex[m][0]) < epsilon and abs(vertex[n][1] - vertex[m][1]) < epsilon):
                         edge_list = np.vstack((edge_list, np.array((n,m))))
 
-            degree = np.bincount(edge_list.flatten()).max()
+            degree = np.bincount(edge_list.flatten()).max() if edge_list.size else 0
             if degree > 2:
                 raise Exception("Graph is not a path")
 
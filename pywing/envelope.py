@@ -0,0 +1,84 @@
+import numpy as np
+import collections, math
+
+# Checks run on machine and synced paths (3xN arrays of X, Y, Z points)
+# before cutting. Each check first compares bounds, which is enough for
+# valid paths, and only looks at every point or segment when they fail.
+
+TRAVEL = 'travel'
+WIRE_ANGLE = 'wire angle'
+COLLISION = 'collision'
+
+# index is the first point or segment of the paths involved
+Issue = collections.namedtuple('Issue', 'kind message index')
+
+def check(machine_l, machine_r, synced_l, synced_r, dimensions, max_wire_angle):
+    if np.size(machine_l, 1) == 0:
+        return []
+    issues = list()
+    issues += check_travel(machine_l, machine_r, dimensions)
+    issues += check_wire_angle(machine_l, machine_r, max_wire_angle)
+    issues += check_leads(synced_l, 'left')
+    issues += check_leads(synced_r, 'right')
+    return issues
+
+def check_travel(machine_l, machine_r, dimensions):
+    # X and Z axes of both towers must stay in [0, length] and [0, height]
+    length, width, height = dimensions
+    issues = list()
+    for name, path in (('left', machine_l), ('right', machine_r)):
+        for row, axis, limit in ((0, 'X', length), (2, 'Z', height)):
+            values = path[row]
+            low, high = np.amin(values), np.amax(values)
+            if low >= 0.0 and high <= limit:
+                continue
+            n = int(np.flatnonzero((values < 0.0) | (values > limit))[0])
+            issues.append(Issue(TRAVEL, '%s tower %s axis out of travel (%.1fmm to %.1fmm, limit %.1fmm)' % (name, axis, low, high, limit), n))
+    return issues
+
+def check_wire_angle(machine_l, machine_r, max_wire_angle):
+    # angle between the wire and Y axis, the axis between towers
+    delta = machine_l - machine_r
+    angles = np.arctan2(np.hypot(delta[0], delta[2]), np.abs(delta[1]))
+    limit = math.radians(max_wire_angle)
+    if np.amax(angles) <= limit:
+        return []
+    over = np.flatnonzero(angles > limit)
+    angle = math.degrees(np.amax(angles))
+    return [Issue(WIRE_ANGLE, 'wire angle reaches %.1f° on %d points (limit %.1f°)' % (angle, over.size, max_wire_angle), int(over[0]))]
+
+def check_leads(path, name):
+    # lead in and lead out must not cross the profile, the wire would cut
+    # through the part on its way in or out of the block. Only the own
+    # profile is checked: the block cross-section is not known, so leads
+    # starting inside the block or parts larger than it are not detected.
+    if np.size(path, 1) < 4:
+        return []
+    points = path[::2]
+    profile_a = points[:, 1:-2]
+    profile_b = points[:, 2:-1]
+    issues = list()
+    for lead, a, b, n in (('lead in', points[:, 0], points[:, 1], 0),
+                          ('lead out', points[:, -2], points[:, -1], np.size(path, 1) - 2)):
+        # profile segments adjacent to the lead share a point with it
+        skip = slice(1, None) if n == 0 else slice(None, -1)
+        hits = _intersections(a, b, profile_a[:, skip], profile_b[:, skip])
+        if hits.size > 0:
+            issues.append(Issue(COLLISION, '%s %s crosses the %s profile (block extents are not checked)' % (name, lead, name), n))
+    return issues
+
+def _intersections(a, b, seg_a, seg_b):
+    # index of segments seg_a -> seg_b properly crossing segment a -> b
+    lo, hi = np.minimum(a, b), np.maximum(a, b)
+    near = np.flatnonzero(np.all(np.maximum(seg_a, seg_b) >= lo[:, None], axis=0) &
+                          np.all(np.minimum(seg_a, seg_b) <= hi[:, None], axis=0))
+    if near.size == 0:
+        return near
+    c, d = seg_a[:, near], seg_b[:, near]
+    def side(p, q, r):
+        return (q[0] - p[0]) * (r[1] - p[1]) - (q[1] - p[1]) * (r[0] - p[0])
+    ab_c = side(a, b, c)
+    ab_d = side(a, b, d)
+    cd_a = side(c, d, a)
+    cd_b = side(c, d, b)
+    return near[(ab_c * ab_d < 0.0) & (cd_a * cd_b < 0.0)]
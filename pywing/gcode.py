@@ -0,0 +1,75 @@
+import numpy as np
+
+# Program as arrays: positions is a 4xN array of machine axes (X Y U V),
+# feeds the N-1 feedrates of the moves reaching each position after the
+# first one. Feedrates apply to the longest of XY and UV displacements.
+
+line_format = "G01 F%.3f X%.3f Y%.3f U%.3f V%.3f\n"
+move_format = "G01 X%.3f Y%.3f U%.3f V%.3f\n"
+
+feed_max_change = 0.25 # max relative feedrate change between consecutive moves
+feed_quantum = 0.01    # feedrates are rounded down to steps of this size relative to cut feedrate
+
+def tower_distances(delta):
+    # displacement length of right (XY) and left (UV) towers
+    return np.hypot(delta[0], delta[1]), np.hypot(delta[2], delta[3])
+
+def program(machine_l, machine_r, synced_l, synced_r, feedrate):
+    # returns positions, feeds and index of each position in input paths
+    positions = np.vstack((machine_r[0], machine_r[2], machine_l[0], machine_l[2]))
+    synced = np.vstack((synced_r[0], synced_r[2], synced_l[0], synced_l[2]))
+
+    # skip moves without displacement on synced profiles
+    keep = np.concatenate(([True], np.any(np.diff(synced, axis=1) != 0.0, axis=0)))
+    index = np.flatnonzero(keep)
+    positions = positions[:, index]
+    synced = synced[:, index]
+
+    m_dist = np.maximum(*tower_distances(np.diff(positions, axis=1)))
+    s_dist = np.maximum(*tower_distances(np.diff(synced, axis=1)))
+    return positions, m_dist / s_dist * feedrate, index
+
+def plan_feeds(positions, feeds, feedrate, max_velocity, max_change=feed_max_change, quantum=feed_quantum):
+    # clamp feedrates to axis max velocities (mm/min), then smooth and
+    # quantize them downward so that consecutive moves share F words,
+    # steps are relative to feedrate which is kept exact
+    delta = np.diff(positions, axis=1)
+    length = np.maximum(*tower_distances(delta))
+    feeds = np.array(feeds, dtype=float)
+    moving = np.flatnonzero((length > 0.0) & (feeds > 0.0))
+    if moving.size == 0:
+        return feeds
+
+    axis_ratio = np.abs(delta[:, moving]) / length[moving]
+    with np.errstate(divide='ignore'):
+        limit = np.min(np.reshape(max_velocity, (4, 1)) / axis_ratio, axis=0)
+    log_feed = np.log(np.minimum(feeds[moving], limit) / feedrate)
+
+    # largest feeds below requested ones with a bounded ratio between
+    # neighbours: f[i] <= f[j] * (1 + max_change)^|i-j|, forward and backward
+    step = np.log1p(max_change) * np.arange(moving.size)
+    forward = np.minimum.accumulate(log_feed - step) + step
+    backward = np.minimum.accumulate((log_feed + step)[::-1])[::-1] - step
+    log_feed = np.minimum(forward, backward)
+
+    q = np.log1p(quantum)
+    planned = feedrate * np.exp(np.floor(log_feed / q + 1e-9) * q)
+
+    # moves without displacement keep previous feedrate
+    fill = np.maximum.accumulate(np.where(np.isin(np.arange(feeds.size), moving), np.arange(feeds.size), 0))
+    result = np.empty_like(feeds)
+    result[moving] = planned
+    result[:moving[0]] = planned[0]
+    result[moving[0]:] = result[fill[moving[0]:]]
+    return result
+
+def format_program(positions, feeds, feedrate):
+    # F word is only written when feedrate changes
+    if positions.size == 0:
+        return str()
+    feeds = np.round(np.insert(feeds, 0, feedrate), 3)
+    changed = np.insert(feeds[1:] != feeds[:-1], 0, True)
+    lines = list()
+    for f, c, p in zip(feeds.tolist(), changed.tolist(), positions.transpose().tolist()):
+        lines.append(line_format % ((f,) + tuple(p)) if c else move_format % tuple(p))
+    return ''.join(lines)
@@ -1,25 +1,14 @@
 from PyQt5 import QtCore
 import numpy as np
+import math
 from vispy import scene, gloo
 from cuttingpathvisual import CuttingPathVisual
-import triangle
+from scenegeometry import *
+import instrument
+import lod
 
 gloo.gl.use_gl('glplus')
 
-def triangulate(path):
-    if np.size(path, 1) > 2:
-        dup_idx = np.argwhere(np.all(np.isclose(path[:,1:], path[:,:-1], atol=1e-3), axis=0)).flatten()
-        if np.allclose(path[:,0], path[:,-1], atol=1e-3):
-            dup_idx = np.append(dup_idx, 0)
-        path = np.delete(path, dup_idx, axis=1).transpose()
-
-        n = np.size(path, 0)
-        segments = np.column_stack((np.arange(n), np.arange(1, n+1)))
-        segments[-1][1] = 0
-
-        result = triangle.triangulate({'vertices': path, 'segments': segments}, "p")
-        return result['vertices'], result['triangles']
-
 def on_mouse_press(event):
     pass
     # print("press",event.pos, event.button, event.delta)
@@ -28,50 +17,21 @@ def on_mouse_move(event):
     pass
     # print("move",event.pos, event.button, event.delta)
 
-def lines(n, normal):
-    alternate = np.empty((2*n,))
-    alternate[::2] = 0
-    alternate[1::2] = 1
-    if normal == 'x':
-        return np.vstack((np.zeros(2*n), np.repeat(np.arange(0, n, 1), 2), alternate))
-    if normal == 'y':
-        return np.vstack((np.repeat(np.arange(0, n, 1), 2), np.zeros(2*n), alternate))
-    if normal == 'z':
-        return np.vstack((np.repeat(np.arange(0, n, 1), 2), alternate, np.zeros(2*n)))
-
-def machine_grid(x, y, z, step):
-    x_steps = int(x/step)+1
-    y_steps = int(y/step)+1
-    z_steps = int(z/step)+1
-
-    xlines = lines(x_steps, 'z')
-    ylines = lines(y_steps, 'z')
-    ylines = np.take(ylines, [1,0,2], axis=0)
-    gridxy = np.column_stack((xlines * np.array([[step], [y], [0]]),
-                              ylines * np.array([[x], [step], [0]])))
-
-    xlines = lines(x_steps, 'y')
-    zlines = lines(z_steps, 'y')
-    zlines = np.take(zlines, [2,1,0], axis=0)
-    gridxz = np.column_stack((xlines * np.array([[step], [0], [z]]),
-                              zlines * np.array([[x], [0], [step]])))
-
-    return np.column_stack((gridxy, gridxz, gridxz + np.array([[0],[y],[0]]))).transpose()
-
 class GraphicView(QtCore.QObject):
-    def __init__(self, cut_processor, machine):
+    def __init__(self, cut_processor, machine, progress=None, canvas=None):
         super().__init__()
         self._cut_proc = cut_processor
         self._machine = machine
-        length, width, height = self._machine.get_dimensions()
-
-        self.canvas = scene.SceneCanvas(keys='interactive', size=(800, 600), create_native=True)
-        self.camera = scene.cameras.TurntableCamera(fov=45.0, elevation=30.0, azimuth=30.0, roll=0.0, distance=None)
+        self._progress = progress
+
+        # canvas can be given for offscreen rendering, see render.py
+        if canvas is None:
+            canvas = scene.SceneCanvas(keys='interactive', size=(800, 600), create_native=True)
+        self.canvas = canvas
+        # orthographic camera, fov is 0
+        self.camera = scene.cameras.TurntableCamera(fov=0.0, elevation=30.0, azimuth=30.0, roll=0.0, distance=None)
         self.view = self.canvas.central_widget.add_view(self.camera)
 
-        # set ortho
-        self.camera.fov = 0.0
-
         self.plot_l = scene.LinePlot(width=2.0, color=(0.91, 0.31, 0.22, 1.0), parent=self.view.scene)
         self.plot_r = scene.LinePlot(width=2.0, color=(0.18, 0.53, 0.67, 1.0), parent=self.view.scene)
         self.mplot_l = scene.LinePlot(width=2.0, color=(1.0, 0.0, 0.0, 1.0), parent=self.view.scene)
@@ -81,46 +41,183 @@ class GraphicView(QtCore.QObject):
 
         CuttingPathNode = scene.visuals.create_visual_node(CuttingPathVisual)
         self.cutting_path = CuttingPathNode(color=(0.5, 0.5, 0.5, 1), parent=self.view.scene)
-
-        m_grid = machine_grid(length, width, height, 50)
-        self.mgrid_visual = scene.visuals.Line(pos=m_grid, color=(0.8,0.8,0.8,0.5), connect='segments', antialias=True, parent=self.view.scene)
+        self.wire = scene.visuals.Line(color=(0.9, 0.6, 0.0, 1.0), width=2.0, parent=self.view.scene)
+        self.wire.visible = False
+        self.executed_l = scene.visuals.Line(color=(0.1, 0.7, 0.1, 1.0), width=4.0, parent=self.view.scene)
+        self.executed_r = scene.visuals.Line(color=(0.1, 0.7, 0.1, 1.0), width=4.0, parent=self.view.scene)
+        self.executed_l.visible = self.executed_r.visible = False
+
+        # grid step follows zoom, vertices are only uploaded when machine
+        # dimensions or step change
+        self.mgrid_visual = scene.visuals.Line(color=(0.8,0.8,0.8,0.5), connect='segments', antialias=True, parent=self.view.scene)
+        self._grids = GridCache()
+        self._drawn_grid = None
 
         self.canvas.events.mouse_press.connect(on_mouse_press)
         self.canvas.events.mouse_move.connect(on_mouse_move)
 
-        self._cut_proc.update.connect(self.draw)
+        self.stats_text = scene.visuals.Text('', color=(0.0, 0.0, 0.0, 1.0), font_size=7,
+                                             anchor_x='left', anchor_y='top', parent=self.canvas.scene)
+        self.stats_timer = QtCore.QTimer()
+        self.stats_timer.timeout.connect(self.draw_stats)
+        if instrument.enabled:
+            self.stats_timer.start(500)
+
+        self._triangulations = TriangulationCache()
+
+        # pixel size used by last decimation, paths are decimated again
+        # when zoom changes it by more than lod_zoom_ratio
+        self._lod_pixel_size = None
+        self.lod_zoom_ratio = 2.0
+        self.canvas.events.draw.connect(self._check_lod)
+
+        # Changes only flag the parts to redraw, a timer applies them at
+        # most once per frame. Parts are 'paths' (synced paths and cutting
+        # path), 'machine_paths', 'faces', 'grid', 'wire' and 'progress'.
+        self._dirty = set()
+        self._drawn_profiles = None
+        self.frame_period = 16 # ms
+        self._redraw_timer = QtCore.QTimer()
+        self._redraw_timer.setSingleShot(True)
+        self._redraw_timer.timeout.connect(self._redraw)
+
+        # camera range is only known once drawn, start with a 50 mm step
+        self.draw_grid(50.0)
+
+        self._cut_proc.update.connect(lambda: self.schedule('paths', 'machine_paths', 'faces'))
+        self._machine.properties_changed.connect(lambda: self.schedule('grid'))
+        self._machine.state_changed.connect(lambda: self.schedule('wire'))
+        if self._progress is not None:
+            self._progress.update.connect(lambda: self.schedule('progress'))
+
+    def pixel_size(self):
+        # scene units per pixel at camera center, scale_factor is the view
+        # size there unless a perspective camera is given a distance
+        size = self.camera.scale_factor
+        if self.camera.fov > 0.0 and self.camera.distance is not None:
+            size = 2.0 * self.camera.distance * math.tan(math.radians(self.camera.fov) / 2.0)
+        return size / max(1, min(self.canvas.size))
+
+    def _check_lod(self, event):
+        if lod.grid_step(self.pixel_size()) != self._drawn_grid[1]:
+            self.schedule('grid')
+        if self._lod_pixel_size is None:
+            return
+        ratio = self.pixel_size() / self._lod_pixel_size
+        if ratio > self.lod_zoom_ratio or ratio < 1 / self.lod_zoom_ratio:
+            self._lod_pixel_size = None
+            self.schedule('paths', 'machine_paths')
+
+    def draw_stats(self):
+        # timing overlay in the top left corner of the canvas
+        lines = instrument.summary()
+        if lines:
+            self.stats_text.text = lines
+            self.stats_text.pos = np.column_stack((np.full(len(lines), 5), 5 + 12 * np.arange(len(lines))))
+            self.canvas.update()
+
+    def schedule(self, *parts):
+        self._dirty.update(parts)
+        if not self._redraw_timer.isActive():
+            self._redraw_timer.start(self.frame_period)
 
     def draw(self):
+        # redraw paths now, wire is drawn once the machine reports it
+        self._dirty.update(('paths', 'machine_paths', 'faces'))
+        self._redraw()
+
+    @instrument.timed('GraphicView.draw')
+    def _redraw(self):
+        dirty, self._dirty = self._dirty, set()
+        pixel_size = self.pixel_size()
+        if 'paths' in dirty:
+            self._lod_pixel_size = pixel_size
+            self.draw_paths(pixel_size)
+        if 'machine_paths' in dirty:
+            self.draw_machine_paths(pixel_size)
+        if 'faces' in dirty:
+            self.draw_faces()
+        if 'grid' in dirty:
+            self.draw_grid(lod.grid_step(pixel_size))
+        if 'wire' in dirty:
+            self.draw_wire()
+        if 'progress' in dirty:
+            self.draw_progress()
+
+    def draw_grid(self, step):
+        key = (self._machine.get_dimensions(), step)
+        if key != self._drawn_grid:
+            self._drawn_grid = key
+            self.mgrid_visual.set_data(pos=self._grids.grid(*key))
+
+    def draw_paths(self, pixel_size):
         path_l, path_r = self._cut_proc.get_paths()
+        assert(not np.any(np.isnan(path_l)))
+        assert(not np.any(np.isnan(path_r)))
+
+        # decimate synced paths together so that they keep the same points
+        tolerance = lod.pixel_tolerance * pixel_size
+        if path_l.shape == path_r.shape:
+            index = lod.decimate(np.vstack((path_l, path_r)), tolerance)
+            path_l, path_r = path_l[:, index], path_r[:, index]
+        else:
+            path_l = path_l[:, lod.decimate(path_l, tolerance)]
+            path_r = path_r[:, lod.decimate(path_r, tolerance)]
         self.plot_l.set_data(path_l.transpose(), symbol=None)
         self.plot_r.set_data(path_r.transpose(), symbol=None)
 
-        assert(not np.any(np.isnan(path_l)))
-        assert(not np.any(np.isnan(path_r)))
+        if path_l.size > 0 and path_r.size > 0 and self._cut_proc.get_machine_paths()[0].size > 0:
+            self.cutting_path.set_data(path_l, path_r)
+            wire_length = np.amax(np.linalg.norm(path_l - path_r, axis=0))
+            self.cutting_path.set_segments(lod.segments(wire_length, pixel_size))
+
+    def draw_machine_paths(self, pixel_size):
+        path_l, path_r = self._cut_proc.get_paths()
+        mpath_l, mpath_r = self._cut_proc.get_machine_paths()
+        if path_l.size > 0 and path_r.size > 0 and mpath_l.size > 0:
+            index = lod.decimate(np.vstack((mpath_l, mpath_r)), lod.pixel_tolerance * pixel_size)
+            self.mplot_l.set_data(mpath_l[:, index].transpose(), symbol=None)
+            self.mplot_r.set_data(mpath_r[:, index].transpose(), symbol=None)
 
+    def draw_faces(self):
+        path_l, path_r = self._cut_proc.get_paths()
+        profiles = self._cut_proc.get_profiles()
+        # same arrays at the same place, nothing to do
+        arrays = tuple(p for profile in profiles for p in profile)
+        offsets = (path_l[1][:1].tolist(), path_r[1][:1].tolist())
+        if self._drawn_profiles is not None:
+            drawn_arrays, drawn_offsets = self._drawn_profiles
+            if all(a is b for a, b in zip(arrays, drawn_arrays)) and offsets == drawn_offsets:
+                return
+        self._drawn_profiles = (arrays, offsets)
+
+        profile_l, profile_r = profiles
         if path_l.size > 0:
-            v, f = triangulate(path_l[::2,1:-1]) # remove lead trajectories and Y axis to triangulate
-            v = np.insert(v, 1, path_l[1][0], axis=1) # re-add Y axis
+            v, f = self._triangulations.faces(*profile_l, path_l[1][0])
             self.face_l.set_data(vertices=v, faces=f)
 
         if path_r.size > 0:
-            v, f = triangulate(path_r[::2,1:-1]) # remove lead trajectories and Y axis to triangulate
-            v = np.insert(v, 1, path_r[1][0], axis=1) # re-add Y axis
+            v, f = self._triangulations.faces(*profile_r, path_r[1][0])
             self.face_r.set_data(vertices=v, faces=f)
 
-        if path_l.size > 0 and path_r.size > 0:
-            mpath_l, mpath_r = self._cut_proc.get_machine_paths()
-            self.mplot_l.set_data(mpath_l.transpose(), symbol=None)
-            self.mplot_r.set_data(mpath_r.transpose(), symbol=None)
-
-            vertices = np.hstack((path_l, path_r)).transpose()
-
-            f = np.repeat(np.arange(0, np.size(path_l, 1)), 2)[1:-1]
-            fc = f.copy() + np.size(path_l, 1)
-            faces = np.empty(f.size * 2, dtype=np.int32)
-            faces[0::2] = f
-            faces[1::2] = fc
-            faces = np.reshape(faces, (int(faces.size/4), 4))
-
-            self.cutting_path.set_data(vertices=vertices, faces=faces)
-            # self.camera.set_range()
+    def draw_wire(self):
+        # wire between towers at machine position (X Y U V)
+        position = self._machine.get_wire_position()
+        if position is None:
+            self.wire.visible = False
+            return
+        plane_l, plane_r = self._machine.get_tower_planes()
+        self.wire.set_data(pos=np.array([[position[0], plane_r[0][1], position[1]],
+                                         [position[2], plane_l[0][1], position[3]]]))
+        self.wire.visible = True
+
+    def draw_progress(self):
+        # executed part of the program on both towers
+        if self._progress is None or not self._progress.is_active():
+            self.executed_l.visible = self.executed_r.visible = False
+            return
+        executed = self._progress.executed()
+        plane_l, plane_r = self._machine.get_tower_planes()
+        self.executed_r.set_data(pos=np.column_stack((executed[0], np.full(np.size(executed, 1), plane_r[0][1]), executed[1])))
+        self.executed_l.set_data(pos=np.column_stack((executed[2], np.full(np.size(executed, 1), plane_l[0][1]), executed[3])))
+        self.executed_l.visible = self.executed_r.visible = True
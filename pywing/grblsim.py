@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os, re, select, socket, sys, threading, time, tty, collections
+
+# Software stand-in for the 4-axis (XYUV) hotwire Grbl firmware, speaking
+# the line protocol used by SerialThread over a pseudo terminal or a TCP
+# socket (open it with serial.serial_for_url('socket://localhost:port')).
+#
+# Lines are received in a rx_buffer_size bytes buffer (overflows are
+# counted, Grbl would lose characters), parsed after line_latency seconds
+# and acknowledged once they fit in a planner of planner_size moves. Moves
+# run at constant feedrate (mm/min applied to the longest of XY and UV
+# displacements, as generated by CutProcessor), speed times faster than
+# real time. Realtime commands: '?' status, '!' feed hold, '~' cycle
+# start, 0x18 soft reset.
+
+class GrblSimulator():
+    prompt = "\r\nGrbl 1.1f ['$' for help]\r\n"
+    axes = 'XYUV'
+
+    def __init__(self, rx_buffer_size=128, planner_size=16, speed=1.0, line_latency=0.0, boot_delay=0.1):
+        self.rx_buffer_size = rx_buffer_size
+        self.planner_size = planner_size
+        self.speed = speed
+        self.line_latency = line_latency
+        self.boot_delay = boot_delay
+
+        self.position = [0.0, 0.0, 0.0, 0.0]
+        self.feedrate = 0.0
+        self.hold = False
+        self.stats = collections.Counter()
+
+        self._rx = bytearray()
+        self._planner = collections.deque()
+        self._parser_target = list(self.position)
+        self._parser_feedrate = 0.0
+        self._lock = threading.Condition()
+        self._running = False
+        self._write_fn = None
+        self._threads = list()
+
+    def open_pty(self):
+        # returns the device name to open, the simulator boots each time it is opened
+        master, slave = os.openpty()
+        tty.setraw(slave)
+        name = os.ttyname(slave)
+        os.close(slave)
+        self._master = master
+        self._write_fn = lambda data: os.write(master, data)
+        self._start(self._pty_loop)
+        return name
+
+    def listen(self, port=0):
+        # returns a pyserial url, one client at a time
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind(('localhost', port))
+        self._server.listen(1)
+        self._start(self._socket_loop)
+        return 'socket://localhost:%d' % self._server.getsockname()[1]
+
+    def close(self):
+        self._running = False
+        with self._lock:
+            self._lock.notify_all()
+        for t in self._threads:
+            t.join()
+
+    def _start(self, receive_loop):
+        self._running = True
+        for target in (receive_loop, self._parse_loop, self._motion_loop):
+            t = threading.Thread(target=target, daemon=True)
+            self._threads.append(t)
+            t.start()
+
+    def _pty_loop(self):
+        poll = select.poll()
+        poll.register(self._master, select.POLLIN)
+        connected = False
+        while self._running:
+            events = poll.poll(50)
+            hangup = any(e & select.POLLHUP for fd, e in events)
+            if hangup:
+                # no client has the terminal open
+                connected = False
+                time.sleep(0.05)
+                continue
+            if not connected:
+                connected = True
+                self._boot()
+            if any(e & select.POLLIN for fd, e in events):
+                try:
+                    self._receive(os.read(self._master, 1024))
+                except OSError:
+                    connected = False
+
+    def _socket_loop(self):
+        self._server.settimeout(0.1)
+        while self._running:
+            try:
+                conn, addr = self._server.accept()
+            except socket.timeout:
+                continue
+            conn.settimeout(0.1)
+            self._write_fn = conn.sendall
+            self._boot()
+            while self._running:
+                try:
+                    data = conn.recv(1024)
+                except socket.timeout:
+                    continue
+                except OSError:
+                    break
+                if not data:
+                    break
+                self._receive(data)
+            conn.close()
+
+    def _boot(self):
+        time.sleep(self.boot_delay)
+        with self._lock:
+            self._rx.clear()
+            self._planner.clear()
+            self._parser_target = list(self.position)
+            self.hold = False
+            self._lock.notify_all()
+        self._write(self.prompt)
+
+    def _write(self, text):
+        try:
+            self._write_fn(text.encode('ascii'))
+        except OSError:
+            pass
+
+    def _receive(self, data):
+        with self._lock:
+            for c in data:
+                if c == ord('?'):
+                    self.stats['status_requests'] += 1
+                    self._write(self._status())
+                elif c == ord('!'):
+                    self.hold = True
+                elif c == ord('~'):
+                    self.hold = False
+                elif c == 0x18:
+                    self._rx.clear()
+                    self._planner.clear()
+                    self._parser_target = list(self.position)
+                    self.hold = False
+                    self._write(self.prompt)
+                elif len(self._rx) >= self.rx_buffer_size:
+                    self.stats['overflows'] += 1
+                else:
+                    self._rx.append(c)
+            self.stats['max_rx'] = max(self.stats['max_rx'], len(self._rx))
+            self._lock.notify_all()
+
+    def _status(self):
+        if self.hold:
+            state = 'Hold'
+        elif self._planner:
+            state = 'Run'
+        else:
+            state = 'Idle'
+        return '<%s|MPos:%s|FS:%d,0>\r\n' % (state, ','.join('%.3f' % p for p in self.position), self.feedrate)
+
+    def _parse_loop(self):
+        while self._running:
+            with self._lock:
+                while self._running and (b'\n' not in self._rx or len(self._planner) >= self.planner_size):
+                    self._lock.wait(0.1)
+                if not self._running:
+                    return
+                idx = self._rx.index(b'\n')
+                line = self._rx[:idx+1].decode('ascii', 'replace').strip()
+            if self.line_latency > 0:
+                time.sleep(self.line_latency)
+            with self._lock:
+                # bytes leave the receive buffer once the line is processed
+                del self._rx[:idx+1]
+                response = self._parse(line)
+                self.stats['lines'] += 1
+                self.stats['max_planner'] = max(self.stats['max_planner'], len(self._planner))
+                self._lock.notify_all()
+            self._write(response)
+
+    def _parse(self, line):
+        if not line:
+            return 'ok\r\n'
+        text = re.sub(r'\s', '', line.upper())
+        if not re.fullmatch(r'([A-Z][-+]?[0-9.]+)+', text):
+            self.stats['errors'] += 1
+            return 'error:20\r\n'
+        target = list(self._parser_target)
+        for letter, value in re.findall(r'([A-Z])([-+]?[0-9.]+)', text):
+            try:
+                value = float(value)
+            except ValueError:
+                self.stats['errors'] += 1
+                return 'error:2\r\n'
+            if letter == 'F':
+                self._parser_feedrate = value
+            elif letter in self.axes:
+                target[self.axes.index(letter)] = value
+            elif letter == 'G' and value in (0, 1):
+                pass
+            else:
+                self.stats['errors'] += 1
+                return 'error:20\r\n'
+        if target != self._parser_target:
+            if self._parser_feedrate <= 0:
+                self.stats['errors'] += 1
+                return 'error:22\r\n'
+            self._planner.append((target, self._parser_feedrate))
+            self._parser_target = target
+        return 'ok\r\n'
+
+    def _motion_loop(self):
+        period = 0.005
+        last = time.perf_counter()
+        while self._running:
+            time.sleep(period)
+            now = time.perf_counter()
+            budget = (now - last) * self.speed / 60.0 # minutes of simulated motion
+            last = now
+            with self._lock:
+                while budget > 0 and self._planner and not self.hold:
+                    target, feedrate = self._planner[0]
+                    delta = [t - p for t, p in zip(target, self.position)]
+                    length = max((delta[0]**2 + delta[1]**2)**0.5, (delta[2]**2 + delta[3]**2)**0.5)
+                    duration = length / feedrate
+                    self.feedrate = feedrate
+                    if duration <= budget:
+                        self.position = list(target)
+                        self._planner.popleft()
+                        budget -= duration
+                        self._lock.notify_all()
+                    else:
+                        ratio = budget / duration
+                        self.position = [p + d * ratio for p, d in zip(self.position, delta)]
+                        budget = 0
+                if not self._planner:
+                    self.feedrate = 0.0
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Grbl hotwire simulator')
+    parser.add_argument('--tcp', type=int, help='listen on this TCP port instead of a pseudo terminal')
+    parser.add_argument('--speed', type=float, default=1.0, help='motion speed factor')
+    parser.add_argument('--latency', type=float, default=0.0, help='line processing latency (s)')
+    parser.add_argument('--rx-buffer', type=int, default=128, help='receive buffer size (bytes)')
+    parser.add_argument('--planner', type=int, default=16, help='planner size (moves)')
+    args = parser.parse_args()
+
+    sim = GrblSimulator(args.rx_buffer, args.planner, args.speed, args.latency)
+    if args.tcp is not None:
+        print(sim.listen(args.tcp))
+    else:
+        print(sim.open_pty())
+    sys.stdout.flush()
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        sim.close()
+        print(dict(sim.stats))
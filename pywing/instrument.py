@@ -0,0 +1,95 @@
+import numpy as np
+import collections, functools, json, os, threading, time
+
+# Lightweight timers for hot paths. Disabled timers cost a global lookup
+# and a call, enable with PYWING_PROFILE=1 or instrument.enable().
+
+enabled = os.environ.get('PYWING_PROFILE', '0') not in ('', '0')
+history = 1000 # number of samples kept per timer for rolling stats
+
+_samples = dict()
+_counts = collections.Counter()
+_lock = threading.Lock()
+
+class _Timer():
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.start)
+
+class _NullTimer():
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+_null_timer = _NullTimer()
+
+def enable(state=True):
+    global enabled
+    enabled = state
+
+def timer(name):
+    # context manager: with instrument.timer('name'): ...
+    if not enabled:
+        return _null_timer
+    return _Timer(name)
+
+def timed(name=None):
+    # decorator, named after the function qualified name by default
+    def decorate(function):
+        label = name or function.__qualname__
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record(label, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+def record(name, duration):
+    with _lock:
+        if name not in _samples:
+            _samples[name] = collections.deque(maxlen=history)
+        _samples[name].append(duration)
+        _counts[name] += 1
+
+def reset():
+    with _lock:
+        _samples.clear()
+        _counts.clear()
+
+def stats():
+    # {name: {'count', 'p50', 'p95', 'max'}}, durations in seconds over the last samples
+    with _lock:
+        samples = {k: np.array(v) for k, v in _samples.items()}
+        counts = dict(_counts)
+    result = dict()
+    for name, s in samples.items():
+        p50, p95 = np.percentile(s, (50, 95))
+        result[name] = {'count':counts[name], 'p50':float(p50), 'p95':float(p95), 'max':float(np.max(s))}
+    return result
+
+def summary():
+    lines = list()
+    for name, s in sorted(stats().items()):
+        lines.append('%-28s n=%-6d p50 %7.2fms  p95 %7.2fms  max %7.2fms' %
+                     (name, s['count'], s['p50'] * 1e3, s['p95'] * 1e3, s['max'] * 1e3))
+    return lines
+
+def dump(filename):
+    fp = open(filename, 'w')
+    json.dump({'date':time.strftime('%Y-%m-%dT%H:%M:%S'), 'stats':stats()}, fp, indent=2)
+    fp.close()
@@ -0,0 +1,39 @@
+import importlib, os
+
+# extension -> [loader or 'module.Class' path, description]
+_registry = dict()
+
+def register(extensions, loader, description):
+    # loader is either an object with a load(filename) method, or a
+    # 'module.Class' string imported on first use to keep startup light
+    for e in extensions:
+        _registry[e.upper()] = [loader, description]
+
+def extension(filename):
+    return os.path.splitext(os.path.basename(filename))[1].upper()
+
+def get(filename):
+    ext = extension(filename)
+    if ext not in _registry:
+        raise ValueError('Unknown file extension ' + ext)
+    entry = _registry[ext]
+    if isinstance(entry[0], str):
+        module, name = entry[0].rsplit('.', 1)
+        entry[0] = getattr(importlib.import_module(module), name)
+    return entry[0]
+
+def load(filename):
+    return get(filename).load(filename)
+
+def file_filter():
+    # group extensions by description for file dialogs
+    groups = dict()
+    for ext, entry in _registry.items():
+        groups.setdefault(entry[1], []).append(ext)
+    names = ', '.join(groups.keys())
+    patterns = ' '.join('*' + e.lower() + ' *' + e for exts in groups.values() for e in exts)
+    return names + ' (' + patterns + ');; All Files (*)'
+
+register(('.dat', '.cor'), 'airfoilloader.AirfoilLoader', 'Airfoil')
+register(('.dxf',), 'dxfloader.DXFLoader', 'DXF')
+register(('.svg',), 'svgloader.SVGLoader', 'SVG')
@@ -0,0 +1,70 @@
+import numpy as np
+
+# Level of detail for previews. Polylines are DxN arrays and decimation
+# returns the indices of kept points, so that paths drawn together (left
+# and right sides of a cut) can be stacked and keep the same points.
+# Tolerances are in scene units, computed from the size of a pixel.
+
+pixel_tolerance = 0.5   # max deviation of decimated polylines, in pixels
+segment_pixels = 8.0    # wire length in pixels per tessellation segment
+max_segments = 25       # geometry shader limit, see CuttingPathVisual
+grid_pixels = 20.0      # min spacing of machine grid lines, in pixels
+grid_steps = (10.0, 20.0, 50.0, 100.0, 200.0, 500.0)
+
+def decimate(points, tolerance):
+    # cheap grid pass first, Douglas-Peucker on what is left
+    index = min_distance(points, tolerance)
+    return index[simplify(points[:, index], tolerance)]
+
+def min_distance(points, tolerance):
+    # drop consecutive points falling in the same tolerance sized cell
+    n = np.size(points, 1)
+    if n < 3 or tolerance <= 0.0:
+        return np.arange(n)
+    cells = np.floor(points / tolerance)
+    keep = np.empty(n, dtype=bool)
+    keep[0] = True
+    np.any(cells[:, 1:] != cells[:, :-1], axis=0, out=keep[1:])
+    keep[-1] = True
+    return np.flatnonzero(keep)
+
+def simplify(points, tolerance):
+    # Douglas-Peucker, distances are measured in all D dimensions
+    n = np.size(points, 1)
+    if n < 3 or tolerance <= 0.0:
+        return np.arange(n)
+    keep = np.zeros(n, dtype=bool)
+    keep[[0, -1]] = True
+    tol2 = tolerance**2
+    stack = [(0, n - 1)]
+    while stack:
+        a, b = stack.pop()
+        if b - a < 2:
+            continue
+        seg = points[:, b] - points[:, a]
+        rel = points[:, a+1:b] - points[:, a:a+1]
+        len2 = seg @ seg
+        if len2 > 0.0:
+            t = np.clip((seg @ rel) / len2, 0.0, 1.0)
+            rel = rel - seg[:, None] * t
+        dist2 = np.einsum('ij,ij->j', rel, rel)
+        i = np.argmax(dist2)
+        if dist2[i] > tol2:
+            m = a + 1 + i
+            keep[m] = True
+            stack.append((a, m))
+            stack.append((m, b))
+    return np.flatnonzero(keep)
+
+def segments(length, pixel_size):
+    # tessellation count for a wire of given length
+    if pixel_size <= 0.0:
+        return max_segments
+    return int(np.clip(np.ceil(length / pixel_size / segment_pixels), 2, max_segments))
+
+def grid_step(pixel_size):
+    # finest grid step keeping lines grid_pixels apart
+    for step in grid_steps:
+        if step >= pixel_size * grid_pixels:
+            return step
+    return grid_steps[-1]
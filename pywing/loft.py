@@ -0,0 +1,95 @@
+import numpy as np
+import collections
+from pathgenerator import epsilon
+import path, projection
+
+# Cuts through more than two sections. A hot wire only cuts ruled surfaces,
+# so sections between block faces (ribs) are synchronized with both faces,
+# the wire line fitting best every section at each point is cut and the
+# distance from each section to the cut surface is reported.
+
+# rib profile with its own transform, position is 0.0 at left face and
+# 1.0 at right face
+Rib = collections.namedtuple('Rib', 'gen shift kerf_width scale rotation translation lead_size position')
+
+def synchronize_all(gens, tolerance=None):
+    # Synchronize generators together, same as PathGenerator.synchronize on
+    # two of them. Breakpoints of every generator are mapped to degrees of
+    # the first one through sync points, then sorted and grouped so that
+    # each group takes at most one breakpoint per generator. Every
+    # generator is sliced once per group it has no breakpoint in, which
+    # is linear in number of generators and breakpoints.
+    gens = [g.copy() for g in gens]
+    if not all(g.items for g in gens):
+        return gens
+    if tolerance is None:
+        tolerance = epsilon / gens[0].length()
+
+    n = min(len(g.sync_points) for g in gens)
+    knots = [np.concatenate(([0.0], g.sync_points[:n], [1.0])) for g in gens]
+    ref_knots = knots[0]
+
+    degrees = [np.interp(g.degrees()[1:-1], k, ref_knots) for g, k in zip(gens, knots)]
+    degrees.append(ref_knots[1:-1])
+    owners = np.concatenate([np.full(d.size, i) for i, d in enumerate(degrees)])
+    degrees = np.concatenate(degrees)
+    order = np.argsort(degrees, kind='stable')
+
+    # groups as (reference degree, generators having a breakpoint), sync
+    # points are owned by index len(gens) and fix group position
+    sync_owner = len(gens)
+    groups = list()
+    start, members, total, count, sync = None, set(), 0.0, 0, None
+    for i in order:
+        d, o = degrees[i], owners[i]
+        if start is not None and (d - start > tolerance or o in members):
+            groups.append((sync if sync is not None else total / count, members))
+            start, members, total, count, sync = None, set(), 0.0, 0, None
+        if start is None:
+            start = d
+        members.add(o)
+        total += d
+        count += 1
+        if o == sync_owner:
+            sync = d
+    if start is not None:
+        groups.append((sync if sync is not None else total / count, members))
+
+    positions = np.array([g[0] for g in groups])
+    for i, (g, k) in enumerate(zip(gens, knots)):
+        cut = np.array([i not in m for _, m in groups], dtype=bool)
+        g.slice(np.interp(positions[cut], ref_knots, k))
+
+    if len(set(len(g.items) for g in gens)) != 1:
+        raise ValueError('Path synchronisation failure')
+    nb_points = np.amax([[i.nb_points_hint() for i in g.items] for g in gens], axis=0)
+    for g in gens:
+        for i, nb in zip(g.items, nb_points):
+            i.set_nb_points(int(nb))
+    return gens
+
+def rib_path(gen, rib, y):
+    # synchronized rib profile placed at y, as left and right paths are
+    points = gen.generate()
+    points = path.kerf(points, rib.kerf_width / rib.scale)
+    points = path.transform(points, path.transform_matrix(rib.scale, rib.rotation, rib.translation))
+    points = path.with_leads(points, rib.lead_size)
+    return projection.to_3d(points, y)
+
+def fit(sections):
+    # Least squares wire line through the same point of every section,
+    # sections are 3xN paths each at constant Y. Returns wire points at
+    # first and last section Y and the max distance from each section to
+    # the wire lines.
+    p = np.stack(sections)
+    y = p[:, 1, 0]
+    dy = y - np.mean(y)
+    syy = dy @ dy
+    if syy <= 0.0:
+        raise ValueError('Sections must be at different positions')
+    mean = np.mean(p, axis=0)
+    slope = np.einsum('n,nij->ij', dy, p - mean) / syy
+
+    fitted = mean + slope * dy[:, None, None]
+    deviations = np.amax(np.linalg.norm(p - fitted, axis=1), axis=1)
+    return fitted[0], fitted[-1], deviations
@@ -1,6 +1,8 @@
 from PyQt5 import QtCore
-import time, queue
+import time, collections, threading
 import serial.tools.list_ports
+import instrument
+import projection
 
 class MachineModel(QtCore.QObject):
     state_changed = QtCore.pyqtSignal()
@@ -11,6 +13,18 @@ class MachineModel(QtCore.QObject):
         self._wire_position = (0.0, 0.0, 0.0, 0.0)
         self._dimensions = (1000.0, 647.0, 400.0)
 
+        # motion limits of X Y U V axes, as Grbl $110-$113, $120-$123 and $11
+        self._max_velocity = (1000.0, 1000.0, 1000.0, 1000.0) # mm/min
+        self._max_acceleration = (50.0, 50.0, 50.0, 50.0)     # mm/s^2
+        self._junction_deviation = 0.01                       # mm
+
+        # left and right tower planes as (point, normal), None for towers
+        # orthogonal to Y axis at each end of machine width
+        self._tower_planes = None
+
+        # max angle between wire and the axis between towers, in degrees
+        self._max_wire_angle = 30.0
+
     def set_wire_position(self, position):
         self._wire_position = position
         self.state_changed.emit()
@@ -32,11 +46,49 @@ class MachineModel(QtCore.QObject):
     def get_width(self):
         return self._dimensions[1]
 
+    def set_tower_planes(self, planes):
+        if planes is not None:
+            planes = tuple(projection.plane(p, n) for p, n in planes)
+        self._tower_planes = planes
+        self.properties_changed.emit()
+
+    def set_max_wire_angle(self, angle):
+        self._max_wire_angle = angle
+        self.properties_changed.emit()
+
+    def get_max_wire_angle(self):
+        return self._max_wire_angle
+
+    def get_tower_planes(self):
+        if self._tower_planes is None:
+            return projection.towers(self.get_width())
+        return self._tower_planes
+
+    def set_motion_limits(self, max_velocity, max_acceleration, junction_deviation):
+        self._max_velocity = tuple(max_velocity)
+        self._max_acceleration = tuple(max_acceleration)
+        self._junction_deviation = junction_deviation
+        self.properties_changed.emit()
+
+    def get_max_velocity(self):
+        return self._max_velocity
+
+    def get_max_acceleration(self):
+        return self._max_acceleration
+
+    def get_junction_deviation(self):
+        return self._junction_deviation
+
 class SerialThread(QtCore.QThread):
+    # This thread manages the connection and reads Grbl responses. Once
+    # connected, a writer thread streams G-code as soon as responses free
+    # room in Grbl receive buffer and a poller thread requests status.
     connection_changed = QtCore.pyqtSignal()
     port_list_changed = QtCore.pyqtSignal()
+    error_received = QtCore.pyqtSignal(str)
+    program_finished = QtCore.pyqtSignal()
 
-    def __init__(self, machine):
+    def __init__(self, machine, rx_buffer_size=128):
         super().__init__()
         self._machine = machine
         self.port = ""
@@ -45,22 +97,44 @@ class SerialThread(QtCore.QThread):
         self.connected = False
         self.connecting = False
         self.running = False
-        self.stop_request = False
+        # set by play until Grbl is idle with every line acknowledged
+        self.streaming = False
         self.connect_request = False
         self.disconnect_request = False
-        self.gcode = []
-        self.last_status_request = time.time()
+        self.quit_request = False
+        self.gcode = collections.deque()
+
+        self.status_period = 0.2
+        self.port_scan_period = 1.0
 
-        self.on_board_buf = 128
-        self.past_cmd_len = queue.Queue()
+        # character counting: bytes sent but not yet acknowledged by Grbl
+        self.rx_buffer_size = rx_buffer_size
+        self.bytes_in_flight = 0
+        self._in_flight = collections.deque()
+        self._metrics_hook = None
+
+        self._send_cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._status_stop = threading.Event()
+        self._writer = None
+        self._status_poller = None
 
     def __del__(self):
         self.wait()
 
+    def shutdown(self):
+        # disconnect and terminate the thread
+        with self._send_cond:
+            self.quit_request = True
+            self._send_cond.notify_all()
+        self._wake.set()
+
     def connect(self, port):
         if(not self.connected):
             self.port = port
             self.connect_request = True
+            self._wake.set()
         else:
             print("already connected")
             pass
@@ -68,7 +142,9 @@ class SerialThread(QtCore.QThread):
     def disconnect(self):
         if(self.connected):
             if(not self.running):
-                self.disconnect_request = True
+                with self._send_cond:
+                    self.disconnect_request = True
+                    self._send_cond.notify_all()
             else:
                 print("running")
                 pass
@@ -79,8 +155,11 @@ class SerialThread(QtCore.QThread):
     def play(self, gcode):
         if(self.connected):
             if(not self.running):
-                self.gcode = gcode.splitlines(True)
-                self.running = True
+                with self._send_cond:
+                    self.gcode = collections.deque(gcode.splitlines(True))
+                    self.running = True
+                    self.streaming = True
+                    self._send_cond.notify_all()
             else:
                 print("already running")
                 pass
@@ -91,7 +170,11 @@ class SerialThread(QtCore.QThread):
     def stop(self):
         if(self.connected):
             if(self.running):
-                self.stop_request = True
+                # feed hold is a realtime command, it bypasses the buffer
+                with self._send_cond:
+                    self.running = False
+                    self.streaming = False
+                self._write("!")
             else:
                 print("not running")
                 pass
@@ -99,83 +182,143 @@ class SerialThread(QtCore.QThread):
             print("not connected")
             pass
 
+    def set_rx_buffer_size(self, size):
+        # controller serial receive buffer size in bytes
+        with self._send_cond:
+            self.rx_buffer_size = size
+            self._send_cond.notify_all()
+
+    def set_metrics_hook(self, hook):
+        # hook(bytes_in_flight, lines_in_flight) is called from serial threads
+        # each time a line is sent or acknowledged
+        self._metrics_hook = hook
+
     def run(self):
         while(True):
             if(self.connected):
-                if(self.disconnect_request):
-                    self._reset()
-
-                try:
-                    if(self.stop_request):
-                        self.serial.write(("!").encode("ascii"))
-                        self.running = False
-                        self.stop_request = False
-                except serial.SerialException:
-                    self._reset()
-                    continue
-
-                try:
-                    if(self.running):
-                        if(self.gcode):
-                            if(len(self.gcode[0]) <= self.on_board_buf):
-                                cmd = self.gcode.pop(0)
-                                self.serial.write(cmd.encode("ascii"))
-                                self.on_board_buf -= len(cmd)
-                                self.past_cmd_len.put(len(cmd))
-                        else:
-                            self.running = False
-                except serial.SerialException:
-                    self._reset()
-                    continue
-
-                try:
-                    now = time.time()
-                    if(self.last_status_request + 0.2 < now):
-                        self.serial.write(("?").encode("ascii"))
-                        self.last_status_request = now
-                except serial.SerialException:
-                    self._reset()
-                    continue
-
-                try:
-                    read_data = self.serial.readline().decode("ascii")
-                    self._process_read_data(read_data)
-                except serial.SerialException:
-                    self._reset()
-                    continue
-
+                with instrument.timer('SerialThread.loop'):
+                    self._read()
+            elif(self.quit_request):
+                return
+            elif(self.connect_request):
+                self._attempt_connection(self.port)
+                self.connect_request = False
+                if(self.connected):
+                    self._start_workers()
             else:
-                if(self.connect_request):
-                    self._attempt_connection(self.port)
-                    self.connect_request = False
-                else:
-                    self.port_list = [port.device for port in serial.tools.list_ports.comports()]
-                    self.port_list.sort()
-                    self.port_list_changed.emit()
-                    time.sleep(0.2)
+                self._scan_ports()
+                self._wake.wait(self.port_scan_period)
+                self._wake.clear()
+
+    def _read(self):
+        if(self.disconnect_request or self.quit_request):
+            self._reset()
+            return
+        try:
+            read_data = self.serial.readline().decode("ascii")
+        except serial.SerialException:
+            self._reset()
+            return
+        self._process_read_data(read_data)
+
+    def _scan_ports(self):
+        port_list = [port.device for port in serial.tools.list_ports.comports()]
+        port_list.sort()
+        if(port_list != self.port_list):
+            self.port_list = port_list
+            self.port_list_changed.emit()
+
+    def _start_workers(self):
+        self._status_stop.clear()
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._status_poller = threading.Thread(target=self._status_loop, daemon=True)
+        self._writer.start()
+        self._status_poller.start()
+
+    def _can_send(self):
+        if(self.running and not self.gcode):
+            self.running = False
+        elif(self.running and len(self.gcode[0]) > self.rx_buffer_size):
+            self.running = False
+            self.error_received.emit('line of %d characters longer than controller buffer (%d)' % (len(self.gcode[0]), self.rx_buffer_size))
+        return self.running and len(self.gcode[0]) <= self.rx_buffer_size - self.bytes_in_flight
+
+    def _write_loop(self):
+        while(True):
+            with self._send_cond:
+                while(self.connected and not self.disconnect_request and not self._can_send()):
+                    self._send_cond.wait()
+                if(not self.connected or self.disconnect_request):
+                    return
+                cmd = self.gcode.popleft()
+                self._in_flight.append(len(cmd))
+                self.bytes_in_flight += len(cmd)
+                self._report_metrics()
+            if(not self._write(cmd)):
+                return
+
+    def _status_loop(self):
+        while(not self._status_stop.wait(self.status_period)):
+            if(not self._write("?")):
+                return
+
+    def _write(self, data):
+        try:
+            with self._write_lock:
+                self.serial.write(data.encode("ascii"))
+            return True
+        except serial.SerialException:
+            # reading thread resets the connection
+            with self._send_cond:
+                self.disconnect_request = True
+                self._send_cond.notify_all()
+            return False
 
     def _reset(self):
+        with self._send_cond:
+            self.connected = False
+            self.running = False
+            self.streaming = False
+            self._send_cond.notify_all()
+        self._status_stop.set()
+        for t in (self._writer, self._status_poller):
+            if(t is not None):
+                t.join()
         self.serial.close()
-        self.running = False
-        self.stop_request = False
+
         self.connect_request = False
         self.disconnect_request = False
-        self.on_board_buf = 128
-        self.past_cmd_len = queue.Queue()
+        self.gcode = collections.deque()
+        self._in_flight = collections.deque()
+        self.bytes_in_flight = 0
+        self._report_metrics()
 
-        self.connected = False
         self._machine.set_no_wire_position()
         self.connection_changed.emit()
 
     def _process_read_data(self, data):
-        if(data == 'ok\r\n'):
-            self.on_board_buf += self.past_cmd_len.get()
+        data = data.strip()
+        if(data == 'ok'):
+            self._acknowledge()
+        elif(data.startswith('error:')):
+            # a rejected line is removed from the buffer as well
+            self._acknowledge()
+            self.error_received.emit(data)
         elif(data != ''):
             if(data[0] == "<"):
                 self._parse_status(data)
-            else:
-                # handle grbl errors here
-                pass
+
+    def _acknowledge(self):
+        with self._send_cond:
+            # responses to commands sent outside of streaming are not counted
+            if(self._in_flight):
+                self.bytes_in_flight -= self._in_flight.popleft()
+                self._report_metrics()
+            self._send_cond.notify_all()
+
+    def _report_metrics(self):
+        if(self._metrics_hook is not None):
+            self._metrics_hook(self.bytes_in_flight, len(self._in_flight))
 
     def _parse_status(self, status):
         mpos_idx = status.find("MPos:")
@@ -185,11 +328,20 @@ class SerialThread(QtCore.QThread):
             mpos[3] += 0.001
         self._machine.set_wire_position(mpos)
 
+        with self._send_cond:
+            finished = (self.streaming and not self.running and not self._in_flight and
+                        status.startswith("<Idle"))
+            if(finished):
+                self.streaming = False
+        if(finished):
+            self.program_finished.emit()
+
     def _attempt_connection(self, port):
         self.connecting = True
         self.connection_changed.emit()
         try:
-            self.serial = serial.Serial(port, 115200, timeout=2.0)
+            # port can also be a pyserial URL, e.g. socket:// for grblsim
+            self.serial = serial.serial_for_url(port, 115200, timeout=2.0)
             crlf = self.serial.readline()
             prompt = self.serial.readline().decode("ascii")
             if(prompt[:4] == "Grbl"):
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+import numpy as np
+import collections
+import gcode
+
+# Nesting of several parts in one foam block. Parts are programs already
+# projected to the machine, with their paths on both block faces (X Z,
+# leads included). They are only translated in the block cross-section,
+# which moves both towers by the same amount as long as towers are
+# orthogonal to Y axis.
+#
+# The cross-section is a grid of step sized cells, rows going up along Z.
+# Parts are placed lowest first then leftmost where they keep spacing with
+# parts already placed. Between two parts the wire goes straight when no
+# part is on its way, otherwise it goes up above the block, over and down:
+# columns above entry and exit points are kept clear of parts for that.
+
+# faces are the 2xN left and right face paths, matching points
+Part = collections.namedtuple('Part', 'positions feeds faces')
+
+sections = 5 # block sections checked, from left to right face
+
+class Nesting():
+    # Each section has its own grid: a tapered part only takes room and
+    # only blocks columns where it is in that section.
+    def __init__(self, block, step=2.0, spacing=5.0, clearance=10.0):
+        # block is (x, z, length, height) of block cross-section
+        self.block = block
+        self.step = step
+        self.spacing = spacing
+        self.clearance = clearance
+        self.shape = (int(np.ceil(block[3] / step)), int(np.ceil(block[2] / step)))
+        self.parts = []
+        self.offsets = np.zeros((0, 2))
+
+    def place(self, parts, method='outline'):
+        # returns X Z translation of each part, method is 'outline' or 'box'
+        self.parts = list(parts)
+        r = int(np.ceil(self.spacing / self.step))
+        occupied = np.zeros((sections,) + self.shape, dtype=bool)
+        self._area = np.zeros((sections,) + self.shape, dtype=bool)
+        self._cells = [None] * len(self.parts)
+        self.offsets = np.zeros((len(self.parts), 2))
+
+        for i, p in enumerate(self.parts):
+            if min(np.size(f, 1) for f in p.faces) == 0:
+                raise ValueError('Part %d has no path' % (i + 1))
+        rasters = [self._raster(p) for p in self.parts]
+        order = sorted(range(len(self.parts)), key=lambda i: -np.count_nonzero(rasters[i][1]))
+        for i in order:
+            origin, full, area, ends, blocked = rasters[i]
+            h, w = full.shape[1:]
+            if h + 2*r > self.shape[0] or w + 2*r > self.shape[1]:
+                raise ValueError('Part %d does not fit in block' % (i + 1))
+            if blocked:
+                raise ValueError('Part %d has no vertical route to its leads' % (i + 1))
+
+            # offsets where masks do not overlap and leads see block top
+            free = np.ones((self.shape[0] - h - 2*r + 1, self.shape[1] - w - 2*r + 1), dtype=bool)
+            for k in range(sections):
+                if method == 'box':
+                    mask = np.ones((h + 2*r, w + 2*r), dtype=bool)
+                else:
+                    mask = _dilate(np.pad(full[k], r), r)
+                free &= ~_correlate(occupied[k], mask)
+                clear = ~np.flip(np.logical_or.accumulate(np.flip(occupied[k], 0), 0), 0)
+                for row, col in ends[k] + r:
+                    free &= clear[row:row + free.shape[0], col:col + free.shape[1]]
+            cells = np.argwhere(free)
+            if cells.size == 0:
+                raise ValueError('No room left in block for part %d' % (i + 1))
+            row, col = cells[0] + r
+
+            occupied[:, row:row + h, col:col + w] |= full
+            self._area[:, row:row + h, col:col + w] |= area
+            for k in range(sections):
+                for end_row, end_col in ends[k]:
+                    occupied[k, row + end_row:, col + end_col] = True
+            self._cells[i] = (row, col)
+            self.offsets[i] = np.array(self.block[:2]) + np.array([col, row]) * self.step - origin
+        return self.offsets
+
+    def program(self, feedrate, max_velocity):
+        # cutting order and travel between placed parts, returns positions
+        # (4xN) and feeds (N-1) of the whole program
+        if not self.parts:
+            return np.zeros((4, 0)), np.zeros(0)
+        top = self.block[1] + self.block[3] + self.clearance
+        shift = [np.tile(o, 2).reshape(4, 1) for o in self.offsets]
+        left = set(range(len(self.parts)))
+        current = min(left, key=lambda i: tuple(self._cells[i]))
+        positions = [self.parts[current].positions + shift[current]]
+        feeds = [self.parts[current].feeds]
+        left.remove(current)
+        while left:
+            # closest part next
+            start = positions[-1][:, -1]
+            ends = {i: self.parts[i].positions[:, :1] + shift[i] for i in left}
+            routes = {i: self._route(current, i, start, ends[i][:, 0], top) for i in left}
+            current = min(left, key=lambda i: _length(np.column_stack((start, routes[i], ends[i]))))
+            positions += [routes[current], self.parts[current].positions + shift[current]]
+            feeds += [np.full(np.size(routes[current], 1) + 1, float(feedrate)), self.parts[current].feeds]
+            left.remove(current)
+        positions = np.column_stack(positions)
+        feeds = gcode.plan_feeds(positions, np.concatenate(feeds), feedrate, np.array(max_velocity))
+        return positions, feeds
+
+    def _route(self, a, b, start, end, top):
+        # travel positions between start and end, both excluded
+        for k, t in enumerate(np.linspace(0.0, 1.0, sections)):
+            segment = np.column_stack((self._section(a, t)[:, -1], self._section(b, t)[:, 0]))
+            if np.any(self._trace(k, segment)):
+                return np.array([[start[0], end[0]], [top, top], [start[2], end[2]], [top, top]])
+        return np.zeros((4, 0))
+
+    def _section(self, i, t):
+        # path of placed part i between left face (0.0) and right face (1.0)
+        face_l, face_r = self.parts[i].faces
+        return (1.0 - t) * face_l + t * face_r + self.offsets[i].reshape(2, 1)
+
+    def _trace(self, k, points):
+        # part areas of section k met by a polyline in block coordinates
+        cells = _cells(points, np.array(self.block[:2]), self.step)
+        inside = np.all((cells >= 0) & (cells < np.reshape(self.shape[::-1], (2, 1))), axis=0)
+        return self._area[k, cells[1, inside], cells[0, inside]]
+
+    def _raster(self, part):
+        # cells of part sections in a grid at part origin: origin, cells
+        # covered by paths and areas, cells of areas only, cells of lead
+        # ends and whether a section is above its own lead ends
+        paths = [(1.0 - t) * part.faces[0] + t * part.faces[1] for t in np.linspace(0.0, 1.0, sections)]
+        origin = np.amin([np.amin(p, axis=1) for p in paths], axis=0)
+        size = np.amax([np.amax(p, axis=1) for p in paths], axis=0) - origin
+        shape = (sections, int(size[1] / self.step) + 1, int(size[0] / self.step) + 1)
+        area = np.zeros(shape, dtype=bool)
+        full = np.zeros(shape, dtype=bool)
+        ends = list()
+        blocked = False
+        for k, p in enumerate(paths):
+            # leads are single points before and after the profile
+            area[k] = _fill(p[:, 1:-1], origin, self.step, shape[1:])
+            cells = _cells(p, origin, self.step)
+            full[k, cells[1], cells[0]] = True
+            ends.append(np.array([cells[::-1, 0], cells[::-1, -1]]))
+            blocked |= any(np.any(area[k, row + 1:, col]) for row, col in ends[-1])
+        full |= area
+        return origin, full, area, ends, blocked
+
+def _cells(points, origin, step):
+    # cells (column, row) along a polyline, sampled at half a cell
+    points = np.asarray(points, dtype=float)
+    if np.size(points, 1) > 1:
+        delta = np.diff(points, axis=1)
+        n = np.maximum(np.ceil(np.amax(np.abs(delta), axis=0) / step * 2).astype(int), 1)
+        seg = np.repeat(np.arange(n.size), n)
+        t = (np.arange(seg.size) - np.repeat(np.cumsum(n) - n, n)) / n[seg]
+        points = np.column_stack((points[:, seg] + delta[:, seg] * t, points[:, -1]))
+    return np.floor((points - np.reshape(origin, (2, 1))) / step).astype(int)
+
+def _fill(polygon, origin, step, shape):
+    # even-odd fill of a closed polygon, cells are inside when their center is
+    x = (polygon[0] - origin[0]) / step - 0.5
+    z = (polygon[1] - origin[1]) / step - 0.5
+    x0, z0, x1, z1 = x, z, np.roll(x, -1), np.roll(z, -1)
+    low, high = np.minimum(z0, z1), np.maximum(z0, z1)
+    rows = np.ceil(low).astype(int), np.ceil(high).astype(int)
+    count = np.maximum(rows[1] - rows[0], 0)
+    edge = np.repeat(np.arange(count.size), count)
+    row = rows[0][edge] + np.arange(edge.size) - np.repeat(np.cumsum(count) - count, count)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cross = x0[edge] + (row - z0[edge]) * (x1[edge] - x0[edge]) / (z1[edge] - z0[edge])
+    col = np.clip(np.ceil(cross).astype(int), 0, shape[1])
+    keep = (row >= 0) & (row < shape[0])
+    toggle = np.zeros((shape[0], shape[1] + 1), dtype=int)
+    np.add.at(toggle, (row[keep], col[keep]), 1)
+    return (np.cumsum(toggle, axis=1)[:, :-1] % 2).astype(bool)
+
+def _dilate(mask, r):
+    # square dilation of r cells, mask is padded by r beforehand
+    for axis in (0, 1):
+        out = mask.copy()
+        for d in range(1, r + 1):
+            out |= np.roll(mask, d, axis) | np.roll(mask, -d, axis)
+        mask = out
+    return mask
+
+def _correlate(occupied, mask):
+    # for each offset keeping mask in grid, whether it overlaps occupied
+    shape = occupied.shape
+    corr = np.fft.irfft2(np.fft.rfft2(occupied.astype(float)) * np.conj(np.fft.rfft2(mask.astype(float), s=shape)), s=shape)
+    return corr[:shape[0] - mask.shape[0] + 1, :shape[1] - mask.shape[1] + 1] > 0.5
+
+def _length(route):
+    return np.sum(np.linalg.norm(np.diff(route, axis=1), axis=0))
+
+if __name__ == '__main__':
+    import argparse
+    from render import load_project
+    parser = argparse.ArgumentParser(description='Nest pywing projects in one foam block and write a combined program')
+    parser.add_argument('projects', nargs='+', help='.pw project files')
+    parser.add_argument('-o', '--output', required=True, help='G-code file')
+    parser.add_argument('-b', '--block', help='block as X,Z,LENGTH,HEIGHT, whole machine by default')
+    parser.add_argument('-m', '--method', default='outline', choices=('outline', 'box'))
+    parser.add_argument('--spacing', type=float, default=5.0, help='min distance between parts (mm)')
+    parser.add_argument('--step', type=float, default=2.0, help='grid step (mm)')
+    parser.add_argument('-f', '--feedrate', type=float, help='travel feedrate (mm/min), project feedrate by default')
+    args = parser.parse_args()
+
+    # projects do not store the machine, they are all loaded on a default one
+    parts = list()
+    feedrates = set()
+    for project in args.projects:
+        cut_proc, machine = load_project(project)
+        try:
+            parts.append(cut_proc.get_part())
+        except ValueError as e:
+            parser.error('%s: %s' % (project, e))
+        feedrates.add(cut_proc.cut_param.feedrate)
+    if args.feedrate is None and len(feedrates) > 1:
+        parser.error('projects have different feedrates, set one with --feedrate')
+    feedrate = args.feedrate if args.feedrate is not None else feedrates.pop()
+    length, width, height = machine.get_dimensions()
+    block = tuple(float(i) for i in args.block.split(',')) if args.block else (0.0, 0.0, length, height)
+
+    nesting = Nesting(block, args.step, args.spacing)
+    try:
+        offsets = nesting.place(parts, args.method)
+    except ValueError as e:
+        parser.error(str(e))
+    positions, feeds = nesting.program(feedrate, machine.get_max_velocity())
+    with open(args.output, 'w') as f:
+        f.write(gcode.format_program(positions, feeds, feedrate))
+    for project, offset in zip(args.projects, offsets):
+        print('%s: X%+.1f Z%+.1f' % (project, offset[0], offset[1]))
@@ -3,6 +3,15 @@ import numpy as np
 import math, copy
 
 epsilon = 1e-3
+corner_angle = 30.0 # Minimal turning angle of a corner (degree)
+match_distance = 0.05 # Max degree distance of a feature matched on both paths
+sync_spacing = 0.02 # Min degree distance between automatic sync points
+
+# flat record of a PathItem, used to store paths as contiguous arrays
+LINE, ARC = 0, 1
+item_dtype = np.dtype([('type', 'u1'), ('ccw', 'u1'), ('nb_points', '<u4'),
+                       ('start', '<f8', 2), ('end', '<f8', 2), ('center', '<f8', 2),
+                       ('radius', '<f8'), ('rad_start', '<f8'), ('rad_end', '<f8')])
 
 class PathItem(ABC):
     @abstractmethod
@@ -180,11 +189,12 @@ class PathGenerator():
     def generate(self):
         if len(self.items) == 1:
             return self.items[0].generate()
+        elif not self.items:
+            return np.array([[],[]])
         else:
-            path = np.array([[],[]])
-            for i in self.items:
-                path = np.column_stack((path[:,:-1], i.generate()))
-            return path
+            # items share their junction points
+            parts = [i.generate() for i in self.items]
+            return np.column_stack([p[:,:-1] for p in parts[:-1]] + parts[-1:])
 
     def slice(self, degrees):
         if degrees.size == 0:
@@ -279,6 +289,128 @@ class PathGenerator():
         else:
             return np.array([])
 
+    def point_degrees(self):
+        # degree of each point returned by generate()
+        if not self.items:
+            return np.array([])
+        bounds = self.degrees()
+        steps = np.array([i.nb_points - 1 for i in self.items])
+        item_idx = np.repeat(np.arange(steps.size), steps)
+        step_idx = np.arange(item_idx.size) - np.repeat(np.cumsum(steps) - steps, steps)
+        deg = bounds[item_idx] + (bounds[item_idx+1] - bounds[item_idx]) * step_idx / steps[item_idx]
+        return np.append(deg, 1.0)
+
+    def _turning_angles(self, points):
+        # signed turning angle at each inner vertex, zero length segments ignored
+        delta = np.diff(points, axis=1)
+        seg_idx = np.flatnonzero(np.linalg.norm(delta, axis=0) > epsilon * epsilon)
+        delta = delta[:, seg_idx]
+        if self.is_cyclic() and seg_idx.size > 1:
+            # turn at start point is seen from last to first segment
+            seg_idx = np.insert(seg_idx, 0, -1)
+            delta = np.column_stack((delta[:, -1], delta))
+        cross = delta[0,:-1] * delta[1,1:] - delta[1,:-1] * delta[0,1:]
+        dot = np.sum(delta[:,:-1] * delta[:,1:], axis=0)
+        seg_len = np.linalg.norm(delta, axis=0)
+        return seg_idx[1:], np.arctan2(cross, dot), (seg_len[:-1] + seg_len[1:]) / 2
+
+    def trailing_edge(self):
+        # start of an open path, sharpest corner of a closed one
+        if not self.is_cyclic():
+            return 0.0
+        vertex, angle, _ = self._turning_angles(self.generate())
+        if vertex.size == 0:
+            return 0.0
+        return self.point_degrees()[vertex[np.argmax(np.abs(angle))]]
+
+    def leading_edge(self, direction=None):
+        # extremum of the path along direction, farthest point from trailing edge by default
+        if not self.items:
+            return None
+        points = self.generate()
+        degrees = self.point_degrees()
+        if direction is None:
+            te = self.get_point(self.trailing_edge()).reshape(2,1)
+            direction = points[:, np.argmax(np.linalg.norm(points - te, axis=0))] - te[:,0]
+        proj = np.dot(np.array(direction, dtype=float), points)
+        top = np.argmax(proj)
+        # a blunt edge gives several extremal points, take the middle of the run
+        outside = np.flatnonzero(proj < proj[top] - epsilon)
+        first = outside[outside < top]
+        last = outside[outside > top]
+        first = first[-1] + 1 if first.size else 0
+        last = last[0] - 1 if last.size else proj.size - 1
+        return (degrees[first] + degrees[last]) / 2
+
+    def features(self, angle=corner_angle):
+        # return degrees of leading/trailing edges, corners and curvature extrema
+        if not self.items:
+            return {'leading_edge':None, 'trailing_edge':None, 'corners':np.array([]), 'curvature_extrema':np.array([])}
+        points = self.generate()
+        degrees = self.point_degrees()
+        vertex, turn, seg_len = self._turning_angles(points)
+        is_corner = np.abs(turn) > angle / 180 * math.pi
+
+        # keep curvature maxima dominating their neighbourhood to ignore sampling noise
+        curvature = np.abs(turn) / seg_len
+        curvature[is_corner] = 0.0
+        if curvature.size == 0:
+            is_extremum = np.zeros(0, dtype=bool)
+        else:
+            w = min(max(1, curvature.size // 20), curvature.size)
+            padded = np.pad(curvature, w, mode='wrap' if self.is_cyclic() else 'constant')
+            window_max = np.max(np.lib.stride_tricks.sliding_window_view(padded, 2*w + 1), axis=1)
+            is_extremum = (curvature >= window_max) & (curvature > 2 * np.median(curvature))
+
+        return {'leading_edge':self.leading_edge(),
+                'trailing_edge':self.trailing_edge(),
+                'corners':degrees[vertex[is_corner]],
+                'curvature_extrema':degrees[vertex[is_extremum]]}
+
+    def auto_sync_points(self, angle=corner_angle):
+        return PathGenerator.auto_sync_pair(self, self, angle)[0]
+
+    def auto_sync_pair(a, b, angle=corner_angle):
+        # Sync points of a and b proposed together. Leading and trailing
+        # edges are always matched, corners then curvature extrema are only
+        # kept when found on both paths at close degrees, once degrees of b
+        # are mapped to a through the edges.
+        fa, fb = a.features(angle), b.features(angle)
+        if fa['leading_edge'] is None or fb['leading_edge'] is None:
+            return [], []
+        edges_a = np.array([0.0, fa['trailing_edge'], fa['leading_edge'], 1.0])
+        edges_b = np.array([0.0, fb['trailing_edge'], fb['leading_edge'], 1.0])
+        if np.any(np.diff(np.argsort(edges_a, kind='stable')) != np.diff(np.argsort(edges_b, kind='stable'))):
+            # edges in different order, degrees are only mapped end to end
+            knots_a = knots_b = np.array([0.0, 1.0])
+        else:
+            knots_a, knots_b = np.sort(edges_a), np.sort(edges_b)
+
+        pairs = [(edges_a[1:3], edges_b[1:3])]
+        for kind in ('corners', 'curvature_extrema'):
+            deg_a, deg_b = fa[kind], fb[kind]
+            if deg_a.size == 0 or deg_b.size == 0:
+                continue
+            # mutual nearest features
+            dist = np.abs(deg_a[:, None] - np.interp(deg_b, knots_b, knots_a)[None, :])
+            near_b = np.argmin(dist, axis=1)
+            near_a = np.argmin(dist, axis=0)
+            keep = (near_a[near_b] == np.arange(deg_a.size)) & (dist[np.arange(deg_a.size), near_b] < match_distance)
+            pairs.append((deg_a[keep], deg_b[near_b[keep]]))
+
+        # in priority order, a pair is kept if it is not too close to kept
+        # ones or to path ends and keeps both sides in the same order
+        min_a, min_b = max(sync_spacing, epsilon / a.length()), max(sync_spacing, epsilon / b.length())
+        kept_a, kept_b = np.array([0.0, 1.0]), np.array([0.0, 1.0])
+        for pa, pb in zip(np.concatenate([p[0] for p in pairs]), np.concatenate([p[1] for p in pairs])):
+            if np.amin(np.abs(kept_a - pa)) < min_a or np.amin(np.abs(kept_b - pb)) < min_b:
+                continue
+            if np.searchsorted(kept_a, pa) != np.searchsorted(kept_b, pb):
+                continue
+            kept_a = np.insert(kept_a, np.searchsorted(kept_a, pa), pa)
+            kept_b = np.insert(kept_b, np.searchsorted(kept_b, pb), pb)
+        return kept_a[1:-1].tolist(), kept_b[1:-1].tolist()
+
     def synchronize(a, b):
         a = a.copy()
         b = b.copy()
@@ -309,62 +441,67 @@ class PathGenerator():
             b.slice(np.sort(all_b_cut))
 
             if len(a.items) != len(b.items):
-                raise Error('Path synchronisation failure')
+                raise ValueError('Path synchronisation failure')
             for i in range(len(a.items)):
                 nb_points = max(a.items[i].nb_points_hint(), b.items[i].nb_points_hint())
                 a.items[i].set_nb_points(nb_points)
                 b.items[i].set_nb_points(nb_points)
         return a, b
 
-    def close_to(self, p):
-        #NOTE if better performance required, this three variables could be stored between calls
+    def lookup_table(self):
+        # generated path and segment data used by close_to, can be kept
+        # between calls while the path and sync points are unchanged
         generated = self.generate()
-        degrees_buf = self.degrees()
-        length_buf = self.length()
-        idx_table = [(n, i.nb_points-1) for n, i in enumerate(self.items)]
+        table = {'path':generated, 'sync_pos':self.sync_points_pos(), 'sync_deg':list(self.sync_points)}
+        if generated.size == 0:
+            return table
+
+        # degree of a point at t along segment is start + (step + t) * scale
+        steps = np.array([i.nb_points - 1 for i in self.items])
+        item_idx = np.repeat(np.arange(steps.size), steps)
+        table['ab'] = np.diff(generated, axis=1)
+        table['ab2'] = np.einsum('ij,ij->j', table['ab'], table['ab'])
+        table['deg_start'] = self.degrees()[item_idx]
+        table['deg_step'] = np.arange(item_idx.size) - np.repeat(np.cumsum(steps) - steps, steps)
+        table['deg_scale'] = (self.item_lengths() / (self.length() * steps))[item_idx]
+        return table
+
+    def close_to(self, p, table=None):
+        if table is None:
+            table = self.lookup_table()
+        generated = table['path']
 
         if generated.size == 0:
             return None, None
 
         a = generated[:,:-1]
-        b = generated[:,1:]
+        ab = table['ab']
         c = np.array(p).reshape((2,1))
-
-        ab = b - a
         ac = c - a
 
         with np.errstate(divide='ignore', invalid='ignore'):
-            nearest_in_seg = np.nan_to_num(np.clip(np.sum(ab*ac, axis=0) / np.sum(np.square(ab), axis=0), 0.0, 1.0), 0.0)
+            nearest_in_seg = np.nan_to_num(np.clip(np.einsum('ij,ij->j', ab, ac) / table['ab2'], 0.0, 1.0), 0.0)
         nearest_in_abs = nearest_in_seg * ab + a
         dist_to_seg = np.linalg.norm(nearest_in_abs - c, axis=0)
         id = np.argmin(dist_to_seg)
 
-        idx = id
-        deg = 0
-        for i in idx_table:
-            if idx >= i[1]:
-                idx -= i[1]
-            else:
-                deg = degrees_buf[i[0]] + (idx+nearest_in_seg[id]) * self.items[i[0]].length() / (length_buf * i[1])
-                break
-
+        deg = table['deg_start'][id] + (table['deg_step'][id] + nearest_in_seg[id]) * table['deg_scale'][id]
         p_dict = {'pos':nearest_in_abs[:, id], 'dist':dist_to_seg[id], 'deg':deg}
 
-        if not self.sync_points:
+        if not table['sync_deg']:
             return p_dict, None
 
-        sync_pos = self.sync_points_pos()
+        sync_pos = table['sync_pos']
         sync_dist = np.linalg.norm(sync_pos - c, axis=0)
         id = np.argmin(sync_dist)
-        s_dict = {'pos':sync_pos[:, id], 'dist':sync_dist[id], 'deg':self.sync_points[id]}
+        s_dict = {'pos':sync_pos[:, id], 'dist':sync_dist[id], 'deg':table['sync_deg'][id]}
 
         return p_dict, s_dict
 
     def sync_points_pos(self):
-        sync_pos = np.array([[], []])
-        for i in self.sync_points:
-            sync_pos = np.column_stack((sync_pos, self.get_point(i)))
-        return sync_pos
+        if not self.sync_points:
+            return np.array([[], []])
+        return np.column_stack([self.get_point(i) for i in self.sync_points])
 
     def remove_sync_point(self, deg):
         self.sync_points.remove(deg)
@@ -373,9 +510,41 @@ class PathGenerator():
         self.sync_points.append(deg)
         self.sync_points.sort()
 
+    def export_table(self):
+        table = np.zeros(len(self.items), dtype=item_dtype)
+        for n, i in enumerate(self.items):
+            table[n]['nb_points'] = i.nb_points
+            table[n]['start'] = i.start
+            table[n]['end'] = i.end
+            if isinstance(i, Arc):
+                table[n]['type'] = ARC
+                table[n]['ccw'] = i.ccw
+                table[n]['center'] = i.center
+                table[n]['radius'] = i.radius
+                table[n]['rad_start'] = i.rad_start
+                table[n]['rad_end'] = i.rad_end
+            else:
+                table[n]['type'] = LINE
+        return table
+
+    def import_table(table, sync_points=[]):
+        items = list()
+        for r in table:
+            if r['type'] == ARC:
+                item = Arc(r['center'], float(r['radius']), float(r['rad_start']), float(r['rad_end']), bool(r['ccw']))
+            else:
+                item = Line(r['start'], r['end'])
+            item.nb_points = int(r['nb_points'])
+            items.append(item)
+        # items are stored oriented, bypass filtering and orientation
+        gen = PathGenerator()
+        gen.items = items
+        gen.sync_points = [float(i) for i in sync_points]
+        return gen
+
     def copy(self):
         cp = PathGenerator(copy.deepcopy(self.items))
-        cp.sync_points = self.sync_points
+        cp.sync_points = list(self.sync_points)
         return cp
 
     def __add__(self, other):
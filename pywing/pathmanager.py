@@ -3,23 +3,54 @@ import os, sys
 
 from pathgenerator import PathGenerator
 from path import Path
-from airfoilloader import AirfoilLoader
-from dxfloader import DXFLoader
-from svgloader import SVGLoader
+import loaders
 
 import numpy as np
 import datetime
 import pyqtgraph as pg
+import lod
+
+class LoaderThread(QtCore.QThread):
+    progress = QtCore.pyqtSignal(int)
+    loaded = QtCore.pyqtSignal(object)
+    failed = QtCore.pyqtSignal(str)
+
+    def __init__(self, filename, shift):
+        super().__init__()
+        self.filename = filename
+        self.shift = shift
+
+    def run(self):
+        try:
+            self.progress.emit(0)
+            gen = loaders.load(self.filename)
+            if self.isInterruptionRequested():
+                return
+            self.progress.emit(60)
+
+            shift_gen = gen.rotate(self.shift)
+            if self.isInterruptionRequested():
+                return
+            self.progress.emit(100)
+            self.loaded.emit((gen, shift_gen))
+        except Exception as e:
+            self.failed.emit(str(e))
 
 class PathManager(QtCore.QObject):
     gen_update = QtCore.pyqtSignal()
     sync_update = QtCore.pyqtSignal()
     reset = QtCore.pyqtSignal()
+    load_progress = QtCore.pyqtSignal(int)
+    load_failed = QtCore.pyqtSignal(str)
+    loading_changed = QtCore.pyqtSignal()
 
     def __init__(self, color):
         super().__init__()
         self.path = Path()
         self.gen = self.shift_gen = self.sync_gen = PathGenerator()
+        # incremented each time gen is replaced or modified
+        self.gen_version = 0
+        self._lookup = None
         self.raw_path = np.array([[],[]])
 
         self.name = ''
@@ -27,11 +58,16 @@ class PathManager(QtCore.QObject):
         self.loaded = False
         self.shift = 0.0
 
+        self.partner = None
+        self._loader = None
+        self._loader_threads = set()
+
     def export_tuple(self):
         return self.path, self.gen, self.name, self.color, self.loaded, self.shift
 
     def import_tuple(self, tuple):
         self.path, self.gen, self.name, self.color, self.loaded, self.shift = tuple
+        self.gen_version += 1
         self.reset.emit()
         self.sync_update.emit()
 
@@ -66,36 +102,66 @@ class PathManager(QtCore.QObject):
     def get_kerf_width(self):
         return self.path.k
 
+    def set_partner(self, partner):
+        # path manager synchronized with this one
+        self.partner = partner
+
     def load(self, filename):
-        extension = os.path.splitext(os.path.basename(filename))[1].upper()
-        try:
-            if extension == '.DAT' or extension == '.COR':
-                self.gen = self.shift_gen = self.sync_gen = AirfoilLoader.load(filename)
-            elif extension == '.DXF':
-                self.gen = self.shift_gen = self.sync_gen = DXFLoader.load(filename)
-            elif extension == '.SVG':
-                self.gen = self.shift_gen = self.sync_gen = SVGLoader.load(filename)
-        except Exception:
-            print(sys.exc_info())
+        # parse in a worker thread, result is applied in _on_loaded and
+        # synchronized by the cut processor
+        self.cancel_load()
+        self._loader = LoaderThread(filename, self.shift)
+        self._loader.progress.connect(self.load_progress)
+        self._loader.loaded.connect(self._on_loaded)
+        self._loader.failed.connect(self._on_load_failed)
+        self._loader.finished.connect(self._on_loader_finished)
+        # keep a reference on every thread until it finishes, even cancelled ones
+        self._loader_threads.add(self._loader)
+        self._loader.start()
+        self.loading_changed.emit()
+
+    def cancel_load(self):
+        if self._loader is not None:
+            self._loader.requestInterruption()
+            self._loader = None
+            self.loading_changed.emit()
+
+    def is_loading(self):
+        return self._loader is not None
+
+    def _on_loaded(self, result):
+        loader = self.sender()
+        if loader is not self._loader or loader.isInterruptionRequested():
             return
 
-        self.name = os.path.basename(filename)
+        gen, shift_gen = result
+        # swap all generators at once
+        self.gen, self.shift_gen, self.sync_gen = gen, shift_gen, shift_gen
+        self.gen_version += 1
+        self.name = os.path.basename(loader.filename)
         self.loaded = True
-
         self.reset.emit()
         self.sync_update.emit()
 
-    def synchronize(a, b):
-        a.shift_gen = a.gen.rotate(a.shift)
-        b.shift_gen = b.gen.rotate(b.shift)
-        a.sync_gen, b.sync_gen = PathGenerator.synchronize(a.shift_gen, b.shift_gen)
+    def _on_load_failed(self, message):
+        if self.sender() is self._loader:
+            self.load_failed.emit(message)
 
-    def generate(self):
-        self.path.initial_path = self.sync_gen.generate()
-        self.path._apply_transform()
+    def _on_loader_finished(self):
+        loader = self.sender()
+        self._loader_threads.discard(loader)
+        if loader is self._loader:
+            self._loader = None
+            self.loading_changed.emit()
+
+    def lookup_table(self):
+        # generated path and close_to data, kept until generator changes
+        if self._lookup is None or self._lookup[0] != self.gen_version or self._lookup[1] is not self.gen:
+            self._lookup = (self.gen_version, self.gen, self.gen.lookup_table())
+        return self._lookup[2]
 
     def close_to(self, p):
-        return self.gen.close_to(p)
+        return self.gen.close_to(p, self.lookup_table())
 
     def set_shift(self, shift):
         self.shift = shift
@@ -106,14 +172,27 @@ class PathManager(QtCore.QObject):
 
     def reverse(self):
         self.gen.reverse()
+        self.gen_version += 1
         self.sync_update.emit()
 
     def add_sync_point(self, degree):
         self.gen.add_sync_point(degree)
+        self.gen_version += 1
         self.sync_update.emit()
 
     def remove_sync_point(self, degree):
         self.gen.remove_sync_point(degree)
+        self.gen_version += 1
+        self.sync_update.emit()
+
+    def auto_sync(self):
+        # sync points of both paths are proposed together so they match
+        if self.partner is None or not self.partner.loaded:
+            self.gen.sync_points = self.gen.auto_sync_points()
+        else:
+            self.gen.sync_points, self.partner.gen.sync_points = PathGenerator.auto_sync_pair(self.gen, self.partner.gen)
+            self.partner.gen_version += 1
+        self.gen_version += 1
         self.sync_update.emit()
 
 class PathManagerWidget(QtGui.QWidget):
@@ -130,6 +209,9 @@ class PathManagerWidget(QtGui.QWidget):
         self.reverse_btn = QtGui.QPushButton("Reverse")
         self.reverse_btn.clicked.connect(self.on_reverse)
 
+        self.auto_sync_btn = QtGui.QPushButton("Auto sync")
+        self.auto_sync_btn.clicked.connect(self.on_auto_sync)
+
         self.scale_spbox = QtGui.QDoubleSpinBox()
         self.scale_spbox.setRange(1, 10000)
         self.scale_spbox.setValue(self.pm.get_scale())
@@ -154,7 +236,11 @@ class PathManagerWidget(QtGui.QWidget):
 
         self.sync_view = SyncViewWidget(self.pm, self.pm.color)
 
-        self.widgets = (self.name, self.load_btn, self.scale_spbox, self.kerf_spbox, self.shift_spbox, self.reverse_btn)#, self.sync_view)
+        self.progress_bar = QtGui.QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.hide()
+
+        self.widgets = (self.name, self.load_btn, self.progress_bar, self.scale_spbox, self.kerf_spbox, self.shift_spbox, self.reverse_btn, self.auto_sync_btn)#, self.sync_view)
 
         layout = QtGui.QVBoxLayout()
         [layout.addWidget(w) for w in self.widgets]
@@ -162,12 +248,30 @@ class PathManagerWidget(QtGui.QWidget):
         self.setLayout(layout)
 
         self.pm.reset.connect(self.update)
+        self.pm.load_progress.connect(self.progress_bar.setValue)
+        self.pm.load_failed.connect(self.on_load_failed)
+        self.pm.loading_changed.connect(self.on_loading_changed)
 
     def on_load(self):
-        filename, _ = QtGui.QFileDialog.getOpenFileName(self.load_btn.parent(), 'Open File', QtCore.QDir.homePath(), 'Airfoil, DXF, SVG (*.dat *.cor *.dxf *.DXF *.svg);; All Files (*)')
+        if self.pm.is_loading():
+            self.pm.cancel_load()
+            return
+        filename, _ = QtGui.QFileDialog.getOpenFileName(self.load_btn.parent(), 'Open File', QtCore.QDir.homePath(), loaders.file_filter())
         if filename:
             self.pm.load(filename)
 
+    def on_loading_changed(self):
+        if self.pm.is_loading():
+            self.load_btn.setText("Cancel")
+            self.progress_bar.setValue(0)
+            self.progress_bar.show()
+        else:
+            self.load_btn.setText("Load")
+            self.progress_bar.hide()
+
+    def on_load_failed(self, message):
+        QtGui.QMessageBox.warning(self, 'Load failed', message)
+
     def on_scale(self):
         self.pm.scale(self.scale_spbox.value())
 
@@ -177,6 +281,9 @@ class PathManagerWidget(QtGui.QWidget):
     def on_reverse(self):
         self.pm.reverse()
 
+    def on_auto_sync(self):
+        self.pm.auto_sync()
+
     def on_shift(self):
         self.pm.set_shift(self.shift_spbox.value())
 
@@ -224,11 +331,23 @@ class SyncViewWidget(QtGui.QWidget):
         layout.addWidget(self.plot)
         self.setLayout(layout)
         self.pm.reset.connect(self.drawCurve)
+        self.pm.sync_update.connect(self.drawSyncPoints)
 
         self.moveproxy = pg.SignalProxy(self.plot.scene().sigMouseMoved, rateLimit=60, slot=self.mouseMoved)
         self.clickproxy = pg.SignalProxy(self.plot.scene().sigMouseClicked, rateLimit=60, slot=self.mouseClicked)
         self.sync_points = np.array([[],[]])
         self.snap_pixels_len = 20
+        self.cursor_type = 0
+
+        # items are only set again when what they show changed, hovering
+        # only moves the cursor
+        self._drawn_sync_points = None
+        self._drawn_cursor = None
+
+        # full resolution path, the curve shows it decimated to view scale
+        self.path = np.array([[],[]])
+        self._lod_pixel_size = None
+        self.plot.plotItem.getViewBox().sigRangeChanged.connect(self.checkLod)
 
     def mouseMoved(self, evt):
         vb = self.plot.plotItem.getViewBox()
@@ -245,7 +364,7 @@ class SyncViewWidget(QtGui.QWidget):
         else:
             self.cursor_type = 0
 
-        self.drawPoint()
+        self.drawCursor()
 
     def mouseClicked(self, evt):
         if evt[0].button() != 1:
@@ -265,24 +384,52 @@ class SyncViewWidget(QtGui.QWidget):
             self.cursor_type = 2
         else:
             self.cursor_type = 0
-        self.drawPoint()
+        self.drawCursor()
 
     def drawCurve(self):
-        path = self.pm.gen.generate()
-        if path.size > 0:
-            self.curve.setData(path[0], path[1])
+        self.path = self.pm.lookup_table()['path']
+        if self.path.size > 0:
+            # full path for autoRange, then decimated to the new range
+            self.curve.setData(self.path[0], self.path[1])
             # clear other items for autoRange on path only
             self.cursor_item.setData([], [])
             self.sync_points_item.setData([],[])
             self.plot.plotItem.getViewBox().autoRange()
+            self.drawLod()
         else:
             self.curve.setData([], [])
         self.cursor_type = 0
-        self.drawPoint()
+        self._drawn_sync_points = self._drawn_cursor = None
+        self.drawSyncPoints()
+        self.drawCursor()
 
-    def drawPoint(self):
-        self.sync_points = self.pm.gen.sync_points_pos()
+    def checkLod(self):
+        if self._lod_pixel_size is None:
+            return
+        ratio = self.plot.plotItem.getViewBox().viewPixelSize()[0] / self._lod_pixel_size
+        if ratio > 2.0 or ratio < 0.5:
+            self.drawLod()
+
+    def drawLod(self):
+        if self.path.size == 0:
+            return
+        self._lod_pixel_size = self.plot.plotItem.getViewBox().viewPixelSize()[0]
+        index = lod.decimate(self.path, lod.pixel_tolerance * self._lod_pixel_size)
+        self.curve.setData(self.path[0][index], self.path[1][index])
+
+    def drawSyncPoints(self):
+        table = self.pm.lookup_table()
+        if self._drawn_sync_points is table:
+            return
+        self._drawn_sync_points = table
+        self.sync_points = table['sync_pos']
         self.sync_points_item.setData(self.sync_points[0], self.sync_points[1])
+
+    def drawCursor(self):
+        cursor = (self.cursor_type,) if self.cursor_type == 0 else (self.cursor_type, tuple(self.cursor.ravel()))
+        if cursor == self._drawn_cursor:
+            return
+        self._drawn_cursor = cursor
         if self.cursor_type == 0:
             self.cursor_item.setData([], [])
         elif self.cursor_type == 1:
@@ -0,0 +1,128 @@
+from PyQt5 import QtCore
+import threading, itertools
+import instrument
+
+class Cancelled(Exception):
+    pass
+
+class Graph():
+    # Cached computation stages. Inputs are set with a key telling whether
+    # their value changed, a stage is only recomputed when one of the inputs
+    # or stages it depends on got a new value since its last computation.
+    def __init__(self, name):
+        self.name = name
+        self._functions = {}
+        self._deps = {}
+        self._keys = {}
+        self._values = {}
+        self._versions = {}
+        self._used = {}
+        self._counter = itertools.count(1)
+
+    def add_stage(self, name, function, *deps):
+        self._functions[name] = function
+        self._deps[name] = deps
+
+    def set(self, name, value, key=None):
+        # key defaults to value, it must be comparable with ==
+        key = value if key is None else key
+        if name in self._keys and self._keys[name] == key:
+            return False
+        self._keys[name] = key
+        self._values[name] = value
+        self._versions[name] = next(self._counter)
+        return True
+
+    def clear(self):
+        # forget inputs and cached stages, everything is computed again
+        self._keys.clear()
+        self._values.clear()
+        self._versions.clear()
+        self._used.clear()
+
+    def get(self, name, check=None):
+        if name not in self._functions:
+            return self._values[name]
+        deps = self._deps[name]
+        args = [self.get(d, check) for d in deps]
+        versions = tuple(self._versions[d] for d in deps)
+        if self._used.get(name) != versions:
+            if check is not None:
+                check()
+            with instrument.timer(self.name + '.' + name):
+                self._values[name] = self._functions[name](*args)
+            self._used[name] = versions
+            self._versions[name] = next(self._counter)
+        return self._values[name]
+
+class PipelineWorker(QtCore.QThread):
+    # Runs submitted jobs one at a time outside of the GUI thread. Only the
+    # latest submitted job matters: a pending job is replaced by a new one,
+    # a running job is cancelled at its next check and its result dropped.
+    # A job is a callable taking a check function, to be called between
+    # stages, which raises Cancelled once a newer job is submitted.
+    done = QtCore.pyqtSignal(int, object)
+    failed = QtCore.pyqtSignal(int, str)
+
+    def __init__(self):
+        super().__init__()
+        self._cond = threading.Condition()
+        self._run_lock = threading.Lock()
+        self._pending = None
+        self._latest_id = 0
+        self._quit = False
+
+    def submit(self, job):
+        with self._cond:
+            self._latest_id += 1
+            self._pending = (self._latest_id, job)
+            self._cond.notify_all()
+            return self._latest_id
+
+    def run_now(self, job):
+        # run job in calling thread once running job is done, cancel others,
+        # result is None when the job failed and failed was emitted
+        with self._cond:
+            self._latest_id += 1
+            self._pending = None
+            job_id = self._latest_id
+        with self._run_lock:
+            try:
+                return job_id, job(lambda: None)
+            except Exception as e:
+                self.failed.emit(job_id, str(e))
+                return job_id, None
+
+    def latest_id(self):
+        return self._latest_id
+
+    def shutdown(self):
+        with self._cond:
+            self._quit = True
+            self._latest_id += 1
+            self._cond.notify_all()
+
+    def run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._quit:
+                    self._cond.wait()
+                if self._quit:
+                    return
+                job_id, job = self._pending
+                self._pending = None
+
+            def check():
+                if job_id != self._latest_id:
+                    raise Cancelled()
+
+            with self._run_lock:
+                try:
+                    result = job(check)
+                except Cancelled:
+                    continue
+                except Exception as e:
+                    self.failed.emit(job_id, str(e))
+                    continue
+            if job_id == self._latest_id:
+                self.done.emit(job_id, result)
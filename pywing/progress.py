@@ -0,0 +1,88 @@
+from PyQt5 import QtCore
+import numpy as np
+from gcode import tower_distances
+
+class ProgramIndex():
+    # Maps machine positions (X Y U V) back to a program, as a fractional
+    # index: move i reaching position i+1 is done by t when located at i+t.
+    # The machine goes forward along the program so positions are searched
+    # in a window after the last location first, the whole program is only
+    # searched when nothing in the window is close enough.
+    def __init__(self, positions, move_times, tolerance=0.05, window=64):
+        self.positions = positions
+        self.tolerance = tolerance
+        self.window = window
+        delta = np.diff(positions, axis=1)
+        self._delta = delta
+        self._len2 = np.einsum('ij,ij->j', delta, delta)
+        self.distance = np.concatenate(([0.0], np.cumsum(np.maximum(*tower_distances(delta)))))
+        self.time = np.concatenate(([0.0], np.cumsum(move_times)))
+        self._last = 0
+
+    def locate(self, position):
+        p = np.asarray(position[:4], dtype=float).reshape(4, 1)
+        moves = np.size(self.positions, 1) - 1
+        if moves < 1:
+            return 0.0
+        for lo, hi in ((self._last, min(self._last + self.window, moves)), (0, moves)):
+            a = self.positions[:, lo:hi]
+            d = self._delta[:, lo:hi]
+            len2 = self._len2[lo:hi]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                t = np.where(len2 > 0.0, np.einsum('ij,ij->j', p - a, d) / len2, 0.0)
+            t = np.clip(t, 0.0, 1.0)
+            dist2 = np.einsum('ij,ij->j', a + d * t - p, a + d * t - p)
+            i = np.argmin(dist2)
+            if dist2[i] <= self.tolerance**2:
+                break
+        self._last = lo + i
+        return lo + i + t[i]
+
+    def interpolate(self, values, location):
+        i = min(int(location), np.size(values) - 2)
+        return values[i] + (values[i+1] - values[i]) * (location - i)
+
+    def executed(self, location):
+        # positions from program start to location
+        i = min(int(location), np.size(self._delta, 1) - 1)
+        end = self.positions[:, i] + self._delta[:, i] * (location - i)
+        return np.column_stack((self.positions[:, :i+1], end))
+
+class ProgressModel(QtCore.QObject):
+    # progress of the program being cut, from machine status reports
+    update = QtCore.pyqtSignal()
+
+    def __init__(self, machine):
+        super().__init__()
+        self._machine = machine
+        self._index = None
+        self.location = 0.0
+        self._machine.state_changed.connect(self.on_state_change)
+
+    def start(self, positions, move_times):
+        self._index = ProgramIndex(positions, move_times)
+        self.location = 0.0
+        self.update.emit()
+
+    def stop(self):
+        self._index = None
+        self.update.emit()
+
+    def is_active(self):
+        return self._index is not None
+
+    def on_state_change(self):
+        position = self._machine.get_wire_position()
+        if self._index is not None and position is not None:
+            self.location = self._index.locate(position)
+            self.update.emit()
+
+    def executed(self):
+        return self._index.executed(self.location)
+
+    def fraction(self):
+        total = self._index.distance[-1]
+        return self._index.interpolate(self._index.distance, self.location) / total if total > 0.0 else 1.0
+
+    def remaining_time(self):
+        return self._index.time[-1] - self._index.interpolate(self._index.time, self.location)
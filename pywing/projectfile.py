@@ -0,0 +1,131 @@
+import numpy as np
+import json, pickle, struct
+
+from pathgenerator import PathGenerator, item_dtype
+from path import Path
+
+# File layout, all values little endian:
+#   magic (8 bytes) | version (u32) | header size (u32) | JSON header | arrays
+# Arrays are 8-byte aligned, their offset and length are stored in the header.
+# Files without magic are legacy pickled projects and are migrated on load.
+# Version 2 adds ribs, paths between faces with their position.
+
+class ProjectFile():
+    magic = b'PYWING\0\0'
+    version = 2
+    prefix = struct.Struct('<8sII')
+    align = 8
+
+    def save(filename, state):
+        # state is the tuple returned by load()
+        abs_on_right, cut_param, foam_block, abs_pos, rel_pos, path_l, path_r, ribs = state
+
+        arrays = list()
+        def add_array(a):
+            arrays.append(np.ascontiguousarray(a))
+            return len(arrays) - 1
+
+        header = {'abs_on_right':bool(abs_on_right),
+                  'cut_param':[float(i) for i in cut_param],
+                  'foam_block':[float(i) for i in foam_block],
+                  'abs_pos':[abs_pos[0], float(abs_pos[1]), [float(i) for i in abs_pos[2]]],
+                  'rel_pos':[rel_pos[0], float(rel_pos[1]), [float(i) for i in rel_pos[2]]],
+                  'paths':[],
+                  'ribs':[]}
+        def path_entry(path, gen, name, color, loaded, shift):
+            return {'name':name,
+                    'color':list(color),
+                    'loaded':bool(loaded),
+                    'shift':float(shift),
+                    'scale':float(path.s),
+                    'kerf':float(path.k),
+                    'items':add_array(gen.export_table()),
+                    'sync_points':add_array(np.array(gen.sync_points, dtype='<f8'))}
+        for p in (path_l, path_r):
+            header['paths'].append(path_entry(*p))
+        for p, position in ribs:
+            entry = path_entry(*p)
+            entry['position'] = float(position)
+            header['ribs'].append(entry)
+
+        # array offsets depend on header size, itself depending on offsets digits
+        header['arrays'] = [[0, i.dtype.descr if i.dtype.names else i.dtype.str, i.shape[0]] for i in arrays]
+        while True:
+            data = ProjectFile._pad(json.dumps(header).encode('utf-8'), ProjectFile.prefix.size, b' ')
+            offset = ProjectFile.prefix.size + len(data)
+            offsets = list()
+            for a in arrays:
+                offsets.append(offset)
+                offset += ProjectFile._aligned(a.nbytes)
+            if offsets == [i[0] for i in header['arrays']]:
+                break
+            for i, o in zip(header['arrays'], offsets):
+                i[0] = o
+
+        fp = open(filename, 'wb')
+        fp.write(ProjectFile.prefix.pack(ProjectFile.magic, ProjectFile.version, len(data)))
+        fp.write(data)
+        for a in arrays:
+            fp.write(ProjectFile._pad(a.tobytes(), 0, b'\0'))
+        fp.close()
+
+    def load(filename):
+        fp = open(filename, 'rb')
+        prefix = fp.read(ProjectFile.prefix.size)
+        fp.close()
+        if len(prefix) < ProjectFile.prefix.size or prefix[:8] != ProjectFile.magic:
+            return ProjectFile._load_legacy(filename)
+
+        magic, version, header_size = ProjectFile.prefix.unpack(prefix)
+        if version > ProjectFile.version:
+            raise ValueError('Project file version %d is not supported' % version)
+
+        data = np.memmap(filename, dtype=np.uint8, mode='r')
+        header = json.loads(bytes(data[ProjectFile.prefix.size:ProjectFile.prefix.size + header_size]).decode('utf-8'))
+        arrays = list()
+        for offset, descr, count in header['arrays']:
+            if isinstance(descr, list):
+                # JSON turned descr tuples and field shapes into lists
+                descr = [tuple(i[:2]) + tuple(tuple(j) for j in i[2:]) for i in descr]
+            dtype = np.dtype(descr)
+            arrays.append(np.frombuffer(data, dtype=dtype, count=count, offset=offset))
+
+        def path_tuple(p):
+            path = Path()
+            path.scale(p['scale'])
+            path.set_kerf_width(p['kerf'])
+            gen = PathGenerator.import_table(arrays[p['items']], arrays[p['sync_points']])
+            return (path, gen, p['name'], tuple(p['color']), p['loaded'], p['shift'])
+        paths = [path_tuple(p) for p in header['paths']]
+        # version 1 files have no ribs
+        ribs = [(path_tuple(p), p['position']) for p in header.get('ribs', [])]
+
+        return (header['abs_on_right'],
+                tuple(header['cut_param']),
+                tuple(header['foam_block']),
+                tuple(header['abs_pos']),
+                tuple(header['rel_pos']),
+                paths[0],
+                paths[1],
+                ribs)
+
+    def _load_legacy(filename):
+        # sequence of pickled tuples written by previous versions
+        fp = open(filename, 'rb')
+        state = [pickle.load(fp) for i in range(7)]
+        fp.close()
+
+        # rebuild paths from their items so objects get current attributes
+        for n in (5, 6):
+            path, gen, name, color, loaded, shift = state[n]
+            new_path = Path()
+            new_path.scale(path.s)
+            new_path.set_kerf_width(path.k)
+            state[n] = (new_path, PathGenerator.import_table(gen.export_table(), gen.sync_points), name, color, loaded, shift)
+        return tuple(state) + ([],)
+
+    def _aligned(size):
+        return -(-size // ProjectFile.align) * ProjectFile.align
+
+    def _pad(data, start, fill):
+        return data + fill * (ProjectFile._aligned(start + len(data)) - start - len(data))
@@ -0,0 +1,53 @@
+import numpy as np
+
+# Projection of the wire onto the machine towers. Paths are 3xN arrays of
+# X, Y, Z points where Y is the axis between towers. A plane is a tuple of
+# a point and a unit normal, both 3 element arrays. Each wire line goes
+# through a left and a right synced point and is intersected with the
+# plane of each tower.
+
+min_incidence = 1e-9 # min |cos| between wire and plane normal
+
+def plane(point, normal):
+    normal = np.asarray(normal, dtype=float)
+    length = np.linalg.norm(normal)
+    if length == 0.0 or not np.isfinite(length):
+        raise ValueError('Plane normal must be a non zero vector')
+    return np.asarray(point, dtype=float), normal / length
+
+def towers(width):
+    # default machine: left tower at Y = width, right tower at Y = 0
+    return (plane((0.0, width, 0.0), (0.0, 1.0, 0.0)),
+            plane((0.0, 0.0, 0.0), (0.0, 1.0, 0.0)))
+
+def to_3d(path, y):
+    # place a 2D path (X, Z rows) at distance y along Y axis
+    out = np.empty((3, np.size(path, 1)))
+    out[0] = path[0]
+    out[1] = y
+    out[2] = path[1]
+    return out
+
+def project(left, right, planes):
+    # returns the intersection of wire lines with each plane
+    left = np.asarray(left, dtype=float)
+    right = np.asarray(right, dtype=float)
+    if left.shape != right.shape or left.ndim != 2 or np.size(left, 0) != 3:
+        raise ValueError('Left and right paths must be 3xN arrays of same size')
+
+    direction = right - left
+    length = np.sqrt(np.einsum('ij,ij->j', direction, direction))
+    if np.any(length == 0.0):
+        n = np.flatnonzero(length == 0.0)[0]
+        raise ValueError('Wire has no direction at point %d, left and right points are equal' % n)
+
+    out = list()
+    for point, normal in planes:
+        denom = normal @ direction
+        parallel = np.abs(denom) <= min_incidence * length
+        if np.any(parallel | ~np.isfinite(denom)):
+            n = np.flatnonzero(parallel | ~np.isfinite(denom))[0]
+            raise ValueError('Wire is parallel to tower plane at point %d' % n)
+        t = (normal @ point - normal @ left) / denom
+        out.append(left + direction * t)
+    return out
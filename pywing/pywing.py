@@ -3,8 +3,7 @@
 from PyQt5 import QtCore, QtGui, QtOpenGL
 import pyqtgraph as pg
 import numpy as np
-import pickle
-import sys, math
+import sys, os, math
 
 from machine import *
 from foamblock import *
@@ -12,20 +11,48 @@ from position import *
 from cutparameters import *
 from graphicview import *
 
+from pathgenerator import PathGenerator
 from pathmanager import PathManager, PathManagerWidget
+from projectfile import ProjectFile
+from pipeline import PipelineWorker, Graph
+from progress import ProgressModel
+from ribs import RibsWidget
+import path
+import gcode, cycletime, projection, envelope, loft, nesting
+import instrument
 
 class CutProcessor(QtCore.QObject):
     update = QtCore.pyqtSignal()
+    ribs_changed = QtCore.pyqtSignal()
 
-    def __init__(self, machine_model, path_manager_l, path_manager_r, abs_pos_model, rel_pos_model, foam_block_model, cut_param_model):
+    def __init__(self, machine_model, path_manager_l, path_manager_r, abs_pos_model, rel_pos_model, foam_block_model, cut_param_model, threaded=True):
         super().__init__()
         self._machine_model = machine_model
 
+        # paths are computed by a worker thread, or inline if not threaded
+        self._graph = self._build_graph()
+        self._gen_copies = dict()
+        self._program_graph = Graph('CutProcessor')
+        self._program_graph.add_stage('program', CutProcessor._program, 'machine_paths', 'synced_paths', 'feedrate', 'max_velocity')
+        self._worker = None
+        self._applied_id = 0
+        if threaded:
+            self._worker = PipelineWorker()
+            self._worker.done.connect(self._on_computed)
+            self._worker.failed.connect(self._on_failed)
+            self._worker.start()
+
         self.path_manager_l = self.rel_path_manager = path_manager_l
         self.path_manager_r = self.abs_path_manager = path_manager_r
+        self.path_manager_l.set_partner(self.path_manager_r)
+        self.path_manager_r.set_partner(self.path_manager_l)
 
         self.abs_on_right = True
 
+        # path managers of profiles between faces, with their position
+        self._ribs = []
+        self.deviations = None
+
         self.foam_block = foam_block_model
         self.cut_param = cut_param_model
 
@@ -38,100 +65,250 @@ class CutProcessor(QtCore.QObject):
 
         self._path_l = self._path_r = np.array([[],[],[]])
         self._machine_path_l = self._machine_path_r = np.array([[],[],[]])
+        self._profiles = ((np.array([[],[]]), np.identity(3)),) * 2
+        self.projection_error = None
+        self.issues = []
 
-        self.path_manager_l.gen_update.connect(self._generate_paths)
-        self.path_manager_r.gen_update.connect(self._generate_paths)
-        self.path_manager_l.sync_update.connect(self._connect_paths)
-        self.path_manager_r.sync_update.connect(self._connect_paths)
+        self.path_manager_l.gen_update.connect(self._request)
+        self.path_manager_r.gen_update.connect(self._request)
+        self.path_manager_l.sync_update.connect(self._request)
+        self.path_manager_r.sync_update.connect(self._request)
 
         self.abs_pos.update.connect(self._apply_transform)
         self.rel_pos.update.connect(self._apply_transform)
         self.cut_param.update.connect(self._apply_transform)
-        self.foam_block.update.connect(self._connect_paths)
-
-    def _generate_paths(self):
-        self.path_manager_l.generate()
-        self.path_manager_r.generate()
-
-        self._path_l = np.insert(self.path_manager_l.path.get_path(), 1, self.foam_block.offset + self.foam_block.width, axis=0)
-        self._path_r = np.insert(self.path_manager_r.path.get_path(), 1, self.foam_block.offset, axis=0)
-
-        if self.is_synced():
-            # gen machine path
-            #TODO to be cleaned
-            width = self._machine_model.get_width()
-            left = self._path_l
-            right = self._path_r
-            self._machine_path_l = np.vstack(((left[0]-right[0])/(left[1]-right[1])*(width-left[1])+left[0], (left[2]-right[2])/(left[1]-right[1])*(width-left[1])+left[2]))
-            self._machine_path_l = np.insert(self._machine_path_l, 1, width, axis=0)
-            self._machine_path_r = np.vstack(((right[0]-left[0])/(right[1]-left[1])*(0.0-right[1])+right[0], (right[2]-left[2])/(right[1]-left[1])*(0.0-right[1])+right[2]))
-            self._machine_path_r = np.insert(self._machine_path_r, 1, 0.0, axis=0)
+        self.foam_block.update.connect(self._request)
+
+    def _build_graph(self):
+        # load -> rotate shift -> synchronize -> generate -> kerf -> transform
+        # -> lead -> block offset -> machine projection, g-code has its own
+        # graph living in GUI thread
+        g = Graph('CutProcessor')
+        for n, side in enumerate(('_l', '_r')):
+            g.add_stage('shift_gen' + side, PathGenerator.rotate, 'gen' + side, 'shift' + side)
+            g.add_stage('points' + side, lambda gens, n=n: gens[-n].generate(), 'sync_gens')
+            g.add_stage('kerf' + side, lambda p, k, s: path.kerf(p, k / s), 'points' + side, 'kerf_width' + side, 'scale' + side)
+            g.add_stage('tr_mat' + side, path.transform_matrix, 'scale' + side, 'rotation' + side, 'translation' + side)
+            g.add_stage('transformed' + side, path.transform, 'kerf' + side, 'tr_mat' + side)
+            g.add_stage('lead' + side, path.with_leads, 'transformed' + side, 'lead_size' + side)
+            g.add_stage('synced' + side, projection.to_3d, 'lead' + side, 'offset' + side)
+        g.add_stage('rib_gens', lambda ribs: tuple(PathGenerator.rotate(r.gen, r.shift) for r in ribs), 'ribs')
+        g.add_stage('sync_gens', CutProcessor._synchronize, 'shift_gen_l', 'shift_gen_r', 'rib_gens')
+        g.add_stage('rib_paths', CutProcessor._rib_paths, 'sync_gens', 'ribs', 'offset_l', 'offset_r')
+        g.add_stage('lofted', CutProcessor._loft, 'synced_l', 'synced_r', 'rib_paths')
+        g.add_stage('machine_paths', CutProcessor._project, 'lofted', 'planes')
+        g.add_stage('issues', CutProcessor._check, 'machine_paths', 'lofted', 'dimensions', 'max_wire_angle')
+        return g
+
+    def _request(self):
+        job = self._make_job()
+        if self._worker is None:
+            try:
+                result = job(lambda: None)
+            except Exception as e:
+                self._fail(str(e))
+                return
+            self._apply(result)
+        else:
+            self._worker.submit(job)
+
+    def _make_job(self):
+        # snapshot of every input, taken in GUI thread and applied to the
+        # graph by the job, generators are only copied when they changed
+        inputs = dict()
+        offsets = (self.foam_block.offset + self.foam_block.width, self.foam_block.offset)
+        for side, pm, offset in (('_l', self.path_manager_l, offsets[0]), ('_r', self.path_manager_r, offsets[1])):
+            inputs['gen' + side] = (self._gen_copy(side, pm), pm.gen_version)
+            inputs['shift' + side] = (pm.shift, None)
+            inputs['kerf_width' + side] = (pm.path.k, None)
+            inputs['scale' + side] = (pm.path.s, None)
+            inputs['rotation' + side] = (pm.path.r, None)
+            inputs['translation' + side] = (tuple(pm.path.t), None)
+            inputs['lead_size' + side] = (pm.path.l, None)
+            inputs['offset' + side] = (offset, None)
+        # ribs added in the editor have no profile until loaded
+        loaded_ribs = [(pm, position) for pm, position in self._ribs if pm.loaded]
+        ribs = tuple(loft.Rib(self._gen_copy(pm, pm), pm.shift, pm.path.k, pm.path.s, pm.path.r, tuple(pm.path.t), pm.path.l, position)
+                     for pm, position in loaded_ribs)
+        inputs['ribs'] = (ribs, tuple((id(pm), pm.gen_version) + r[1:] for (pm, _), r in zip(loaded_ribs, ribs)))
+        planes = self._machine_model.get_tower_planes() if self.is_synced() else None
+        inputs['planes'] = (planes, None if planes is None else tuple(tuple(map(tuple, p)) for p in planes))
+        inputs['dimensions'] = (self._machine_model.get_dimensions(), None)
+        inputs['max_wire_angle'] = (self._machine_model.get_max_wire_angle(), None)
+        return lambda check: CutProcessor._compute(self._graph, inputs, check)
+
+    def _gen_copy(self, key, pm):
+        # generators are only copied when they changed
+        if key not in self._gen_copies or self._gen_copies[key][0] != pm.gen_version:
+            self._gen_copies[key] = (pm.gen_version, pm.gen.copy())
+        return self._gen_copies[key][1]
+
+    @instrument.timed('CutProcessor._compute')
+    def _compute(graph, inputs, check):
+        for name, (value, key) in inputs.items():
+            graph.set(name, value, key)
+        outputs = ('shift_gen_l', 'shift_gen_r', 'sync_gens', 'kerf_l', 'kerf_r', 'tr_mat_l', 'tr_mat_r')
+        result = {name: graph.get(name, check) for name in outputs}
+        result['projection_error'] = None
+        result['synced_l'], result['synced_r'], result['deviations'] = graph.get('lofted', check)
+        try:
+            result['machine_paths'] = graph.get('machine_paths', check)
+            result['issues'] = graph.get('issues', check)
+        except ValueError as e:
+            result['machine_paths'] = None
+            result['issues'] = []
+            result['projection_error'] = str(e)
+        return result
+
+    def _synchronize(gen_l, gen_r, rib_gens):
+        # left, ribs from left to right, right
+        if not rib_gens:
+            return PathGenerator.synchronize(gen_l, gen_r)
+        return tuple(loft.synchronize_all((gen_l,) + rib_gens + (gen_r,)))
+
+    def _rib_paths(sync_gens, ribs, offset_l, offset_r):
+        return tuple(loft.rib_path(gen, rib, offset_l + (offset_r - offset_l) * rib.position)
+                     for gen, rib in zip(sync_gens[1:-1], ribs))
+
+    def _loft(synced_l, synced_r, rib_paths):
+        # wire positions at faces, and deviation of each section from the cut
+        sections = (synced_l,) + rib_paths + (synced_r,)
+        if not rib_paths or synced_l.size == 0 or any(p.shape != synced_l.shape for p in sections):
+            return synced_l, synced_r, None
+        return loft.fit(sections)
+
+    def _project(lofted, planes):
+        if planes is None:
+            return None
+        return tuple(projection.project(lofted[0], lofted[1], planes))
+
+    def _check(machine_paths, lofted, dimensions, max_wire_angle):
+        if machine_paths is None:
+            return []
+        return envelope.check(*machine_paths, lofted[0], lofted[1], dimensions, max_wire_angle)
+
+    def _on_computed(self, job_id, result):
+        # results of superseded jobs are dropped
+        if job_id != self._worker.latest_id():
+            return
+        self._applied_id = job_id
+        self._apply(result)
+
+    def _on_failed(self, job_id, message):
+        if job_id != self._worker.latest_id():
+            return
+        self._applied_id = job_id
+        self._fail(message)
+
+    def _fail(self, message):
+        # paths are cleared rather than left stale, error is shown like
+        # projection errors
+        self._path_l = self._path_r = np.array([[],[],[]])
+        self._machine_path_l = self._machine_path_r = np.array([[],[],[]])
+        self.deviations = None
+        self.projection_error = message
+        self.issues = []
+        self.update.emit()
 
+    def _apply(self, result):
+        self.path_manager_l.shift_gen = result['shift_gen_l']
+        self.path_manager_r.shift_gen = result['shift_gen_r']
+        self.path_manager_l.sync_gen, self.path_manager_r.sync_gen = result['sync_gens'][0], result['sync_gens'][-1]
+        self._path_l, self._path_r = result['synced_l'], result['synced_r']
+        self.deviations = result['deviations']
+        self._profiles = ((result['kerf_l'], result['tr_mat_l']), (result['kerf_r'], result['tr_mat_r']))
+        self.projection_error = result['projection_error']
+        self.issues = result['issues']
+        if result['machine_paths'] is not None:
+            self._machine_path_l, self._machine_path_r = result['machine_paths']
+        elif self.projection_error is not None:
+            self._machine_path_l = self._machine_path_r = np.array([[],[],[]])
         self.update.emit()
 
-    def _connect_paths(self):
-        PathManager.synchronize(self.path_manager_l, self.path_manager_r)
-        self._generate_paths()
+    def flush(self):
+        # bring paths up to date before reading them outside of update
+        if self._worker is not None and self._applied_id != self._worker.latest_id():
+            # a failed job is reported through failed, like in the worker
+            self._applied_id, result = self._worker.run_now(self._make_job())
+            if result is not None:
+                self._apply(result)
+
+    def close(self):
+        if self._worker is not None:
+            self._worker.shutdown()
+            self._worker.wait()
+
+    def get_program(self):
+        # machine positions (4xN), feedrates (N-1) and index of positions in paths
+        if not self.is_synced() or self._machine_path_l.size == 0:
+            return np.zeros((4, 0)), np.zeros(0), np.zeros(0, dtype=int)
+        g = self._program_graph
+        g.set('machine_paths', (self._machine_path_l, self._machine_path_r), (id(self._machine_path_l), id(self._machine_path_r)))
+        g.set('synced_paths', (self._path_l, self._path_r), (id(self._path_l), id(self._path_r)))
+        g.set('feedrate', self.cut_param.feedrate)
+        g.set('max_velocity', tuple(self._machine_model.get_max_velocity()))
+        return g.get('program')
+
+    def _program(machine_paths, synced_paths, feedrate, max_velocity):
+        positions, feeds, index = gcode.program(*machine_paths, *synced_paths, feedrate)
+        feeds = gcode.plan_feeds(positions, feeds, feedrate, np.array(max_velocity))
+        return positions, feeds, index
 
     def generate_gcode(self):
-        gcode = list()
-        if(self.path_manager_l.loaded and self.path_manager_r.loaded):
-            prev_pos = (self._machine_path_r[0][0],
-                        self._machine_path_r[2][0],
-                        self._machine_path_l[0][0],
-                        self._machine_path_l[2][0])
-            prev_pos_s = (self._path_r[0][0],
-                          self._path_r[2][0],
-                          self._path_l[0][0],
-                          self._path_l[2][0])
-            gcode.append("G01 F%.3f X%.3f Y%.3f U%.3f V%.3f\n" % ((self.cut_param.feedrate,) + prev_pos))
-
-
-            for i in range(1, len(self._path_r[0])):
-                new_pos = (self._machine_path_r[0][i],
-                           self._machine_path_r[2][i],
-                           self._machine_path_l[0][i],
-                           self._machine_path_l[2][i])
-                new_pos_s = (self._path_r[0][i],
-                             self._path_r[2][i],
-                             self._path_l[0][i],
-                             self._path_l[2][i])
-                machine_diff = np.array(new_pos) - np.array(prev_pos)
-                synced_diff = np.array(new_pos_s) - np.array(prev_pos_s)
-                m_square = np.square(machine_diff)
-                s_square = np.square(synced_diff)
-                m_dist = max(math.sqrt(m_square[0]+m_square[1]), math.sqrt(m_square[2]+m_square[3]))
-                s_dist = max(math.sqrt(s_square[0]+s_square[1]), math.sqrt(s_square[2]+s_square[3]))
-
-                #TODO do a real gcode post proc
-                if s_dist == 0.0:
-                    continue
-
-                prev_pos = new_pos
-                prev_pos_s = new_pos_s
-                gcode.append("G01 F%.3f X%.3f Y%.3f U%.3f V%.3f\n" % ((m_dist / s_dist * self.cut_param.feedrate,) + new_pos))
-
-        program = str()
-        #TODO repair
-        # program += ";Left  airfoil: " + self.path_manager_l.name
-        # program += (" | S: %.2f R: %.2f TX: %.2f TY: %.2f K: %.2f\n" %
-        #         (self.path_manager_l.s,
-        #         self.path_manager_l.r,
-        #         self.path_manager_l.t[0],
-        #         self.path_manager_l.t[1],
-        #         self.path_manager_l.k))
-        # program += ";Right airfoil : " + self.path_manager_r.name
-        # program += (" | S: %.2f R: %.2f TX: %.2f TY: %.2f K: %.2f\n" %
-        #         (self.path_manager_r.s,
-        #         self.path_manager_r.r,
-        #         self.path_manager_r.t[0],
-        #         self.path_manager_r.t[1],
-        #         self.path_manager_r.k))
-
-        for command in gcode:
-            program += command
-
-        return program
+        self.flush()
+        positions, feeds, index = self.get_program()
+        return gcode.format_program(positions, feeds, self.cut_param.feedrate)
+
+    def get_part(self):
+        # program with block face paths, to be nested with other parts
+        self.flush()
+        positions, feeds, index = self.get_program()
+        if positions.size == 0:
+            raise ValueError('Project has no machine path, paths must be loaded and projected on the machine')
+        return nesting.Part(positions, feeds, (self._path_l[[0, 2]], self._path_r[[0, 2]]))
+
+    def estimate_cycle_time(self):
+        positions, feeds, index = self.get_program()
+        if positions.size == 0:
+            return None
+
+        # sections are lead in, parts between sync points and lead out
+        gen = self.path_manager_l.sync_gen
+        bounds = np.searchsorted(gen.point_degrees(), gen.sync_points) + 1
+        bounds = np.concatenate(([1], bounds, [np.size(self._path_l, 1) - 2]))
+        bounds = np.searchsorted(index, bounds)
+        sections = [('lead in', 0, bounds[0])]
+        sections += [('section %d' % (n+1), bounds[n], bounds[n+1]) for n in range(len(bounds) - 1)]
+        sections += [('lead out', bounds[-1], np.size(positions, 1) - 1)]
+
+        return cycletime.estimate(positions, feeds,
+                                  self._machine_model.get_max_velocity(),
+                                  self._machine_model.get_max_acceleration(),
+                                  self._machine_model.get_junction_deviation(),
+                                  sections)
+
+    def set_ribs(self, ribs):
+        # ribs are (path manager, position) with position from 0.0 at left
+        # face to 1.0 at right face, each path manager has its own scale and
+        # kerf width, placement follows faces
+        for pm, _ in self._ribs:
+            pm.gen_update.disconnect(self._request)
+            pm.sync_update.disconnect(self._request)
+        self._ribs = list(ribs)
+        for pm, _ in self._ribs:
+            pm.gen_update.connect(self._request)
+            pm.sync_update.connect(self._request)
+        self._gen_copies = {k: v for k, v in self._gen_copies.items() if k in ('_l', '_r')}
+        self.ribs_changed.emit()
+        self._apply_transform()
+
+    def get_ribs(self):
+        return list(self._ribs)
+
+    def get_deviations(self):
+        # max distance from left face, loaded ribs and right face to the cut
+        # surface, None without ribs
+        return self.deviations
 
     def is_synced(self):
         return self.path_manager_l.loaded and self.path_manager_r.loaded
@@ -142,6 +319,10 @@ class CutProcessor(QtCore.QObject):
     def get_paths(self):
         return (self._path_l, self._path_r)
 
+    def get_profiles(self):
+        # profiles without leads before transform, with their transform matrix
+        return self._profiles
+
     def get_machine_paths(self):
         return (self._machine_path_l, self._machine_path_r)
 
@@ -160,6 +341,7 @@ class CutProcessor(QtCore.QObject):
     def _apply_transform(self):
         self.abs_path_manager.blockSignals(True)
         self.rel_path_manager.blockSignals(True)
+        [pm.blockSignals(True) for pm, _ in self._ribs]
 
         self.abs_path_manager.set_lead_size(self.cut_param.lead)
         self.rel_path_manager.set_lead_size(self.cut_param.lead)
@@ -177,8 +359,18 @@ class CutProcessor(QtCore.QObject):
         self.rel_path_manager.translate_x(self.abs_pos.t[0] + x)
         self.rel_path_manager.translate_y(self.abs_pos.t[1] + y)
 
+        # ribs are placed between faces, rotation and translation are
+        # interpolated from left to right face at rib position
+        path_l, path_r = self.path_manager_l.path, self.path_manager_r.path
+        for pm, position in self._ribs:
+            pm.set_lead_size(self.cut_param.lead)
+            pm.rotate(path_l.r + (path_r.r - path_l.r) * position)
+            pm.translate_x(path_l.t[0] + (path_r.t[0] - path_l.t[0]) * position)
+            pm.translate_y(path_l.t[1] + (path_r.t[1] - path_l.t[1]) * position)
+
         self.abs_path_manager.blockSignals(False)
         self.rel_path_manager.blockSignals(False)
+        [pm.blockSignals(False) for pm, _ in self._ribs]
         self.abs_path_manager.gen_update.emit()
         self.rel_path_manager.gen_update.emit()
 
@@ -200,6 +392,10 @@ class CutProcessor(QtCore.QObject):
             self.abs_path_manager = self.path_manager_l
             self.rel_path_manager = self.path_manager_r
 
+        # ribs keep their place in the block
+        self._ribs = [(pm, 1.0 - position) for pm, position in self._ribs]
+        self.ribs_changed.emit()
+
         # apply relative and absolute position to paths
         self._apply_transform()
 
@@ -207,7 +403,8 @@ class CutProcessor(QtCore.QObject):
         self.foam_block.reverse()
 
     def align(self):
-        if(self.is_synced()):
+        self.flush()
+        if(self.is_synced() and self._machine_path_l.size > 0):
             margin = 5
             bndr = self.get_machine_boundaries()
             self.abs_pos.import_tuple(
@@ -218,30 +415,25 @@ class CutProcessor(QtCore.QObject):
             self._apply_transform()
 
     def save(self, filename):
-        fp = open(filename,'wb+')
-
-        pickle.dump(self.abs_on_right, fp)
-        pickle.dump(self.cut_param.export_tuple(), fp)
-        pickle.dump(self.foam_block.export_tuple(), fp)
-        pickle.dump(self.abs_pos.export_tuple(), fp)
-        pickle.dump(self.rel_pos.export_tuple(), fp)
-        pickle.dump(self.path_manager_l.export_tuple(), fp)
-        pickle.dump(self.path_manager_r.export_tuple(), fp)
-
-        fp.close()
+        ProjectFile.save(filename, (self.abs_on_right,
+                                    self.cut_param.export_tuple(),
+                                    self.foam_block.export_tuple(),
+                                    self.abs_pos.export_tuple(),
+                                    self.rel_pos.export_tuple(),
+                                    self.path_manager_l.export_tuple(),
+                                    self.path_manager_r.export_tuple(),
+                                    [(pm.export_tuple(), position) for pm, position in self._ribs]))
 
     def load(self, filename):
-        fp = open(filename, 'rb')
+        state = ProjectFile.load(filename)
 
-        self.abs_on_right = pickle.load(fp)
-        self.cut_param.import_tuple(pickle.load(fp))
-        self.foam_block.import_tuple(pickle.load(fp))
-        self.abs_pos.import_tuple(pickle.load(fp))
-        self.rel_pos.import_tuple(pickle.load(fp))
-        self.path_manager_l.import_tuple(pickle.load(fp))
-        self.path_manager_r.import_tuple(pickle.load(fp))
-
-        fp.close()
+        self.abs_on_right = state[0]
+        self.cut_param.import_tuple(state[1])
+        self.foam_block.import_tuple(state[2])
+        self.abs_pos.import_tuple(state[3])
+        self.rel_pos.import_tuple(state[4])
+        self.path_manager_l.import_tuple(state[5])
+        self.path_manager_r.import_tuple(state[6])
 
         if self.abs_on_right:
             self.rel_path_manager = self.path_manager_l
@@ -249,18 +441,28 @@ class CutProcessor(QtCore.QObject):
         else:
             self.abs_path_manager = self.path_manager_l
             self.rel_path_manager = self.path_manager_r
-        self._apply_transform()
+
+        ribs = list()
+        for rib, position in state[7]:
+            pm = PathManager(rib[3])
+            pm.import_tuple(rib)
+            ribs.append((pm, position))
+        self.set_ribs(ribs)
 
 class CuttingProcessorWidget(QtGui.QWidget):
 
-    def __init__(self, cut_processor, machine):
+    def __init__(self, cut_processor, machine, progress):
         super().__init__()
 
         self._cut_proc = cut_processor
         self._machine = machine
+        self._progress = progress
+        self._progress.update.connect(self.update_progress)
         self.serial_thread = SerialThread(machine)
         self.serial_thread.connection_changed.connect(self.on_connection_change)
         self.serial_thread.port_list_changed.connect(self.on_port_list_change)
+        self.serial_thread.error_received.connect(self.on_serial_error)
+        self.serial_thread.program_finished.connect(self._progress.stop)
         self.serial_thread.start()
 
         self.reverse_btn = QtGui.QPushButton("Reverse")
@@ -285,12 +487,26 @@ class CuttingProcessorWidget(QtGui.QWidget):
         self.serial_text_item = QtGui.QTextEdit()
         self.serial_data = ""
 
+        self.cycle_time_label = QtGui.QLabel()
+        self._cut_proc.update.connect(self.update_cycle_time)
+        self._cut_proc.cut_param.feedrate_update.connect(self.update_cycle_time)
+        self._machine.properties_changed.connect(self.update_cycle_time)
+
+        self.progress_label = QtGui.QLabel()
+
+        self.issues_label = QtGui.QLabel()
+        self.issues_label.setStyleSheet("color: red")
+        self._cut_proc.update.connect(self.update_issues)
+
         layout = QtGui.QGridLayout()
         layout.addWidget(self.reverse_btn, 0, 0)
         layout.addWidget(self.align_btn, 1, 0)
         layout.addWidget(self.save_btn, 2, 0)
         layout.addWidget(self.load_btn, 3, 0)
         layout.addWidget(self.serial_text_item, 0, 1, 4, 1)
+        layout.addWidget(self.cycle_time_label, 4, 1)
+        layout.addWidget(self.issues_label, 5, 1)
+        layout.addWidget(self.progress_label, 4, 6)
         layout.setColumnStretch(0, 1)
         layout.setColumnStretch(1, 5)
         layout.addWidget(self.port_box, 0, 6)
@@ -329,8 +545,39 @@ class CuttingProcessorWidget(QtGui.QWidget):
 
         self.port_box.insertItems(0, items_to_insert)
 
+    def update_cycle_time(self):
+        estimate = self._cut_proc.estimate_cycle_time()
+        if estimate is None:
+            error = self._cut_proc.projection_error
+            self.cycle_time_label.setText("" if error is None else "Path error : " + error)
+            self.cycle_time_label.setToolTip("")
+            return
+        text = "Estimated time : %d:%02d" % divmod(round(estimate['total']), 60)
+        text += " (%d%% at feedrate)" % round(estimate['feed_limited'] * 100)
+        self.cycle_time_label.setText(text)
+        self.cycle_time_label.setToolTip("\n".join("%s : %.1fs" % i for i in estimate['sections'].items()))
+
+    def update_issues(self):
+        issues = self._cut_proc.issues
+        if issues:
+            self.issues_label.setText("%d issue(s) : %s" % (len(issues), issues[0].message))
+        else:
+            self.issues_label.setText("")
+        self.issues_label.setToolTip("\n".join(i.message for i in issues))
+
+    def on_serial_error(self, error):
+        self.serial_text_item.append(error)
+
+    def update_progress(self):
+        if not self._progress.is_active():
+            self.progress_label.setText("")
+            return
+        text = "%d%%, %d:%02d left" % ((round(self._progress.fraction() * 100),) + divmod(round(self._progress.remaining_time()), 60))
+        self.progress_label.setText(text)
+
     def on_stop(self):
         self.serial_thread.stop()
+        self._progress.stop()
 
     def on_connect(self):
         if(self.serial_thread.connected):
@@ -350,9 +597,22 @@ class CuttingProcessorWidget(QtGui.QWidget):
 
     def on_play(self):
         program = self._cut_proc.generate_gcode()
+        issues = self._cut_proc.issues
+        if issues:
+            answer = QtGui.QMessageBox.warning(self, "Check cut",
+                                               "\n".join(i.message for i in issues) + "\n\nCut anyway ?",
+                                               QtGui.QMessageBox.Yes | QtGui.QMessageBox.No, QtGui.QMessageBox.No)
+            if answer != QtGui.QMessageBox.Yes:
+                return
         self.serial_text_item.setText(program)
+        was_running = self.serial_thread.running
         self.serial_thread.play(program)
 
+        estimate = self._cut_proc.estimate_cycle_time()
+        if self.serial_thread.running and not was_running and estimate is not None:
+            positions, feeds, index = self._cut_proc.get_program()
+            self._progress.start(positions, estimate['move_times'])
+
     def on_reverse(self):
         self._cut_proc.reverse()
 
@@ -385,10 +645,13 @@ if __name__ == '__main__':
 
     cut_proc = CutProcessor(machine, path_manager_l, path_manager_r, abs_pos_model, rel_pos_model, foam_block_model, cut_param_model)
 
-    gview = GraphicView(cut_proc, machine)
+    progress_model = ProgressModel(machine)
+
+    gview = GraphicView(cut_proc, machine, progress_model)
     graphic_view_widget = gview.canvas.native
 
-    cutting_proc_widget = CuttingProcessorWidget(cut_proc, machine)
+    cutting_proc_widget = CuttingProcessorWidget(cut_proc, machine, progress_model)
+    ribs_widget = RibsWidget(cut_proc)
 
     top_widget = QtGui.QWidget()
     grid_layout = QtGui.QGridLayout()
@@ -400,6 +663,7 @@ if __name__ == '__main__':
     grid_layout.addWidget(path_widget_r,0,3)
     grid_layout.addWidget(abs_pos_widget,1,3)
     grid_layout.addWidget(foam_block_widget,2,3)
+    grid_layout.addWidget(ribs_widget,0,4,3,1)
     top_widget.setLayout(grid_layout)
 
     main_widget = QtGui.QWidget()
@@ -409,4 +673,8 @@ if __name__ == '__main__':
     main_widget.setLayout(layout)
     main_widget.show()
 
+    application.aboutToQuit.connect(cut_proc.close)
+    if instrument.enabled and os.environ.get('PYWING_PROFILE_DUMP'):
+        application.aboutToQuit.connect(lambda: instrument.dump(os.environ['PYWING_PROFILE_DUMP']))
+
     sys.exit(application.exec_())
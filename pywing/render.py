@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+import numpy as np
+import os, math, struct, zlib
+import multiprocessing
+
+from scenegeometry import TriangulationCache, machine_grid, surface_triangles
+import lod
+
+# Offscreen previews of projects as PNG images, without display. The 3D
+# view is rendered by vispy when an offscreen GL backend (EGL or OSMesa)
+# is available, otherwise by a NumPy rasterizer drawing the same grid,
+# faces and cutting surface with flat shading.
+
+gl_backends = ('egl', 'osmesa')
+
+background = (1.0, 1.0, 1.0)
+grid_color = (0.8, 0.8, 0.8)
+path_colors = ((0.91, 0.31, 0.22), (0.18, 0.53, 0.67))
+face_colors = ((0.82, 0.28, 0.20), (0.16, 0.48, 0.60))
+machine_path_color = (1.0, 0.0, 0.0)
+surface_color = (0.5, 0.5, 0.5)
+
+def write_png(filename, image):
+    # 8 bits RGB or RGBA image, HxWxC
+    image = np.ascontiguousarray(image, dtype=np.uint8)
+    height, width, channels = image.shape
+    color_type = {3: 2, 4: 6}[channels]
+    raw = np.column_stack((np.zeros((height, 1), dtype=np.uint8), image.reshape(height, width * channels)))
+
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+
+    with open(filename, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, color_type, 0, 0, 0)))
+        f.write(chunk(b'IDAT', zlib.compress(raw.tobytes(), 6)))
+        f.write(chunk(b'IEND', b''))
+
+def load_project(filename):
+    # models without widgets, paths are computed in calling thread
+    from pywing import CutProcessor, MachineModel, PathManager, PositionModel, FoamBlockModel, CutParametersModel
+    machine = MachineModel()
+    cut_proc = CutProcessor(machine, PathManager((0, 0, 0)), PathManager((0, 0, 0)),
+                            PositionModel('Absolute'), PositionModel('Relative'),
+                            FoamBlockModel(machine), CutParametersModel(), threaded=False)
+    cut_proc.load(filename)
+    return cut_proc, machine
+
+def render(cut_proc, machine, size=(800, 600), backend='auto'):
+    # returns an HxWx3 or HxWx4 uint8 image, backend is 'gl', 'numpy' or 'auto'
+    if backend in ('gl', 'auto'):
+        try:
+            return render_gl(cut_proc, machine, size)
+        except Exception:
+            if backend == 'gl':
+                raise
+    return render_numpy(cut_proc, machine, size)
+
+def render_gl(cut_proc, machine, size):
+    from vispy import app, scene
+    from graphicview import GraphicView
+    for name in gl_backends:
+        try:
+            app.use_app(name)
+            break
+        except Exception:
+            pass
+    else:
+        raise RuntimeError('No offscreen GL backend available')
+    canvas = scene.SceneCanvas(size=size, show=False, bgcolor=background)
+    view = GraphicView(cut_proc, machine, canvas=canvas)
+    view.draw()
+    view.camera.set_range()
+    return canvas.render()
+
+class Camera():
+    # orthographic view like GraphicView turntable camera, Z up
+    def __init__(self, elevation=30.0, azimuth=30.0):
+        el, az = math.radians(elevation), math.radians(azimuth)
+        self.direction = np.array([-math.sin(az) * math.cos(el), -math.cos(az) * math.cos(el), math.sin(el)])
+        right = np.cross((0.0, 0.0, 1.0), self.direction)
+        self.right = right / np.linalg.norm(right)
+        self.up = np.cross(self.direction, self.right)
+        self.scale = 1.0
+        self.offset = np.zeros(2)
+
+    def fit(self, points, size, margin=0.05):
+        # points is Nx3, size is (width, height) in pixels
+        xy = points @ np.column_stack((self.right, self.up))
+        low, high = np.amin(xy, axis=0), np.amax(xy, axis=0)
+        extent = np.maximum(high - low, 1e-9)
+        self.scale = min(size[0] / extent[0], size[1] / extent[1]) * (1.0 - 2 * margin)
+        self.offset = np.array(size) / 2 - (low + high) / 2 * self.scale * np.array([1.0, -1.0])
+
+    def project(self, points):
+        # Nx3 scene points to Nx3 pixel x, pixel y and depth (larger is closer)
+        screen = np.empty((np.size(points, 0), 3))
+        screen[:, 0] = points @ self.right * self.scale + self.offset[0]
+        screen[:, 1] = -(points @ self.up) * self.scale + self.offset[1]
+        screen[:, 2] = points @ self.direction
+        return screen
+
+class Rasterizer():
+    # flat shaded triangles and one pixel lines with a depth buffer
+    def __init__(self, size, color=background):
+        self.width, self.height = size
+        self.color = np.empty((self.height, self.width, 3))
+        self.color[:] = color
+        self.depth = np.full((self.height, self.width), -np.inf)
+
+    def triangles(self, screen, faces, color, normals, light):
+        shade = 0.35 + 0.65 * np.abs(normals @ light)
+        for face, k in zip(faces, shade):
+            p = screen[face]
+            x0, y0 = np.maximum(np.floor(np.amin(p[:, :2], axis=0)).astype(int), 0)
+            x1, y1 = np.minimum(np.ceil(np.amax(p[:, :2], axis=0)).astype(int), (self.width - 1, self.height - 1))
+            if x0 > x1 or y0 > y1:
+                continue
+            area = (p[1,0] - p[0,0]) * (p[2,1] - p[0,1]) - (p[1,1] - p[0,1]) * (p[2,0] - p[0,0])
+            if abs(area) < 1e-12:
+                continue
+            x, y = np.meshgrid(np.arange(x0, x1 + 1) + 0.5, np.arange(y0, y1 + 1) + 0.5)
+            w0 = ((p[2,0] - p[1,0]) * (y - p[1,1]) - (p[2,1] - p[1,1]) * (x - p[1,0])) / area
+            w1 = ((p[0,0] - p[2,0]) * (y - p[2,1]) - (p[0,1] - p[2,1]) * (x - p[2,0])) / area
+            w2 = 1.0 - w0 - w1
+            depth = w0 * p[0,2] + w1 * p[1,2] + w2 * p[2,2]
+            zbuf = self.depth[y0:y1+1, x0:x1+1]
+            mask = (w0 >= 0) & (w1 >= 0) & (w2 >= 0) & (depth > zbuf)
+            zbuf[mask] = depth[mask]
+            self.color[y0:y1+1, x0:x1+1][mask] = np.multiply(color, k)
+
+    def segments(self, a, b, color, bias=1e-3):
+        # a and b are Nx3 screen points, lines pass over faces at same depth
+        steps = np.maximum(np.ceil(np.amax(np.abs(b[:, :2] - a[:, :2]), axis=1)).astype(int), 1)
+        seg = np.repeat(np.arange(np.size(a, 0)), steps + 1)
+        t = np.arange(seg.size) - np.repeat(np.cumsum(steps + 1) - (steps + 1), steps + 1)
+        t = t / steps[seg]
+        p = a[seg] + (b[seg] - a[seg]) * t[:, None]
+        x, y = np.floor(p[:, 0]).astype(int), np.floor(p[:, 1]).astype(int)
+        inside = (x >= 0) & (x < self.width) & (y >= 0) & (y < self.height)
+        x, y, depth = x[inside], y[inside], p[inside, 2]
+        visible = depth + bias * max(self.width, self.height) >= self.depth[y, x]
+        self.color[y[visible], x[visible]] = color
+
+    def polyline(self, screen, color):
+        if np.size(screen, 0) > 1:
+            self.segments(screen[:-1], screen[1:], color)
+
+    def image(self):
+        return np.round(np.clip(self.color, 0.0, 1.0) * 255).astype(np.uint8)
+
+def render_numpy(cut_proc, machine, size):
+    length, width, height = machine.get_dimensions()
+    grid = machine_grid(length, width, height, 50)
+    camera = Camera()
+    camera.fit(grid, size)
+    raster = Rasterizer(size)
+
+    grid_screen = camera.project(grid)
+    raster.segments(grid_screen[0::2], grid_screen[1::2], grid_color)
+
+    path_l, path_r = cut_proc.get_paths()
+    if path_l.size == 0 and path_r.size == 0:
+        return raster.image()
+
+    # decimate to the pixel, like GraphicView does
+    tolerance = lod.pixel_tolerance / camera.scale
+    if path_l.shape == path_r.shape:
+        index = lod.decimate(np.vstack((path_l, path_r)), tolerance)
+        path_l, path_r = path_l[:, index], path_r[:, index]
+
+    light = camera.direction
+    triangulations = TriangulationCache()
+    for (profile, tr_mat), path, color in zip(cut_proc.get_profiles(), (path_l, path_r), face_colors):
+        if path.size > 0 and np.size(profile, 1) > 2:
+            vertices, faces = triangulations.faces(profile, tr_mat, path[1][0])
+            raster.triangles(camera.project(vertices), faces, color, np.tile((0.0, 1.0, 0.0), (len(faces), 1)), light)
+
+    mpath_l, mpath_r = cut_proc.get_machine_paths()
+    if path_l.shape == path_r.shape and path_l.size > 0 and mpath_l.size > 0:
+        vertices, faces = surface_triangles(path_l, path_r)
+        tri = vertices[faces]
+        normals = np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0])
+        length = np.linalg.norm(normals, axis=1)
+        normals = normals / np.where(length > 0.0, length, 1.0)[:, None]
+        raster.triangles(camera.project(vertices), faces, surface_color, normals, light)
+
+        index = lod.decimate(np.vstack((mpath_l, mpath_r)), tolerance)
+        raster.polyline(camera.project(mpath_l[:, index].transpose()), machine_path_color)
+        raster.polyline(camera.project(mpath_r[:, index].transpose()), machine_path_color)
+
+    for path, color in zip((path_l, path_r), path_colors):
+        if path.size > 0:
+            raster.polyline(camera.project(path.transpose()), color)
+    return raster.image()
+
+def render_file(job):
+    # job is (project, png, gcode or None, size, backend)
+    project, png, gcode_file, size, backend = job
+    cut_proc, machine = load_project(project)
+    write_png(png, render(cut_proc, machine, size, backend))
+    if gcode_file is not None:
+        with open(gcode_file, 'w') as f:
+            f.write(cut_proc.generate_gcode())
+    return png
+
+def render_files(jobs, processes=None):
+    # each project is rendered in its own process
+    if len(jobs) == 1 or processes == 1:
+        return [render_file(j) for j in jobs]
+    with multiprocessing.Pool(processes) as pool:
+        return pool.map(render_file, jobs)
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Render previews of pywing projects as PNG images')
+    parser.add_argument('projects', nargs='+', help='.pw project files')
+    parser.add_argument('-o', '--output', help='output directory, next to projects by default')
+    parser.add_argument('-s', '--size', default='800x600', help='image size (WIDTHxHEIGHT)')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='parallel processes')
+    parser.add_argument('-b', '--backend', default='auto', choices=('auto', 'gl', 'numpy'))
+    parser.add_argument('--gcode', action='store_true', help='write G-code next to each image')
+    args = parser.parse_args()
+
+    size = tuple(int(i) for i in args.size.split('x'))
+    jobs = list()
+    for project in args.projects:
+        base = os.path.splitext(project)[0]
+        if args.output is not None:
+            base = os.path.join(args.output, os.path.basename(base))
+        jobs.append((project, base + '.png', base + '.gcode' if args.gcode else None, size, args.backend))
+    for png in render_files(jobs, args.jobs):
+        print(png)
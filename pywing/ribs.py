@@ -0,0 +1,120 @@
+from PyQt5 import QtCore, QtGui
+
+from pathmanager import PathManager, PathManagerWidget
+
+class RibsWidget(QtGui.QWidget):
+    # profiles between left and right faces, each rib has its own path
+    # manager and a position from 0.0 at left face to 1.0 at right face
+    color = (92, 163, 72)
+
+    def __init__(self, cut_processor):
+        super().__init__()
+        self._cut_proc = cut_processor
+        self.path_widget = None
+
+        self.rib_list = QtGui.QListWidget()
+        self.rib_list.currentRowChanged.connect(self.on_select)
+
+        self.add_btn = QtGui.QPushButton("Add rib")
+        self.add_btn.clicked.connect(self.on_add)
+
+        self.remove_btn = QtGui.QPushButton("Remove rib")
+        self.remove_btn.clicked.connect(self.on_remove)
+
+        self.position_spbox = QtGui.QDoubleSpinBox()
+        self.position_spbox.setRange(0, 1)
+        self.position_spbox.setSingleStep(0.05)
+        self.position_spbox.setPrefix("P : ")
+        self.position_spbox.valueChanged.connect(self.on_position)
+
+        self.deviation_label = QtGui.QLabel()
+
+        self.path_layout = QtGui.QVBoxLayout()
+
+        layout = QtGui.QVBoxLayout()
+        layout.addWidget(self.rib_list)
+        layout.addWidget(self.add_btn)
+        layout.addWidget(self.remove_btn)
+        layout.addWidget(self.position_spbox)
+        layout.addWidget(self.deviation_label)
+        layout.addLayout(self.path_layout)
+        layout.addStretch()
+        self.setLayout(layout)
+
+        self._cut_proc.ribs_changed.connect(self.update)
+        self._cut_proc.update.connect(self.update_deviations)
+        self.update()
+
+    def on_add(self):
+        ribs = self._cut_proc.get_ribs()
+        ribs.append((PathManager(self.color), 0.5))
+        self._cut_proc.set_ribs(ribs)
+        self.rib_list.setCurrentRow(len(ribs) - 1)
+
+    def on_remove(self):
+        row = self.rib_list.currentRow()
+        if row < 0:
+            return
+        ribs = self._cut_proc.get_ribs()
+        pm, _ = ribs.pop(row)
+        pm.cancel_load()
+        self._cut_proc.set_ribs(ribs)
+
+    def on_position(self):
+        row = self.rib_list.currentRow()
+        if row < 0:
+            return
+        ribs = self._cut_proc.get_ribs()
+        ribs[row] = (ribs[row][0], self.position_spbox.value())
+        self._cut_proc.set_ribs(ribs)
+
+    def on_select(self):
+        row = self.rib_list.currentRow()
+        ribs = self._cut_proc.get_ribs()
+        pm = ribs[row][0] if row >= 0 else None
+
+        self.position_spbox.blockSignals(True)
+        self.position_spbox.setEnabled(pm is not None)
+        self.position_spbox.setValue(ribs[row][1] if pm is not None else 0.0)
+        self.position_spbox.blockSignals(False)
+        self.remove_btn.setEnabled(pm is not None)
+
+        # path widget is only rebuilt when selected rib changes
+        if self.path_widget is not None and self.path_widget.pm is pm:
+            return
+        if self.path_widget is not None:
+            self.path_layout.removeWidget(self.path_widget)
+            self.path_widget.deleteLater()
+            self.path_widget = None
+        if pm is not None:
+            self.path_widget = PathManagerWidget(pm)
+            self.path_layout.addWidget(self.path_widget)
+
+    def update(self):
+        ribs = self._cut_proc.get_ribs()
+        row = self.rib_list.currentRow()
+        self.rib_list.blockSignals(True)
+        while self.rib_list.count() > len(ribs):
+            self.rib_list.takeItem(self.rib_list.count() - 1)
+        while self.rib_list.count() < len(ribs):
+            self.rib_list.addItem("")
+        self.rib_list.setCurrentRow(min(row, len(ribs) - 1))
+        self.rib_list.blockSignals(False)
+        self.on_select()
+        self.update_deviations()
+
+    def update_deviations(self):
+        # deviations are given for left face, loaded ribs and right face
+        deviations = self._cut_proc.get_deviations()
+        n = 1
+        for i, (pm, position) in enumerate(self._cut_proc.get_ribs()):
+            text = "%.2f  %s" % (position, pm.name if pm.loaded else "No path loaded")
+            if pm.loaded and deviations is not None:
+                text += "  (%.2fmm)" % deviations[n]
+            if pm.loaded:
+                n += 1
+            self.rib_list.item(i).setText(text)
+        if deviations is None:
+            self.deviation_label.setText("Deviation : -")
+        else:
+            self.deviation_label.setText("Deviation : L %.2fmm R %.2fmm" % (deviations[0], deviations[-1]))
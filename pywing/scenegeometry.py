@@ -0,0 +1,103 @@
+import numpy as np
+import hashlib, collections
+import triangle
+import instrument
+
+# Geometry of the 3D preview, independent of any GUI or GL backend so that
+# it is shared by GraphicView and offscreen rendering.
+
+@instrument.timed('triangulate')
+def triangulate(path):
+    if np.size(path, 1) > 2:
+        dup_idx = np.argwhere(np.all(np.isclose(path[:,1:], path[:,:-1], atol=1e-3), axis=0)).flatten()
+        if np.allclose(path[:,0], path[:,-1], atol=1e-3):
+            dup_idx = np.append(dup_idx, 0)
+        path = np.delete(path, dup_idx, axis=1).transpose()
+
+        n = np.size(path, 0)
+        segments = np.column_stack((np.arange(n), np.arange(1, n+1)))
+        segments[-1][1] = 0
+
+        result = triangle.triangulate({'vertices': path, 'segments': segments}, "p")
+        return result['vertices'], result['triangles']
+
+def lines(n, normal):
+    alternate = np.empty((2*n,))
+    alternate[::2] = 0
+    alternate[1::2] = 1
+    if normal == 'x':
+        return np.vstack((np.zeros(2*n), np.repeat(np.arange(0, n, 1), 2), alternate))
+    if normal == 'y':
+        return np.vstack((np.repeat(np.arange(0, n, 1), 2), np.zeros(2*n), alternate))
+    if normal == 'z':
+        return np.vstack((np.repeat(np.arange(0, n, 1), 2), alternate, np.zeros(2*n)))
+
+def machine_grid(x, y, z, step):
+    x_steps = int(x/step)+1
+    y_steps = int(y/step)+1
+    z_steps = int(z/step)+1
+
+    xlines = lines(x_steps, 'z')
+    ylines = lines(y_steps, 'z')
+    ylines = np.take(ylines, [1,0,2], axis=0)
+    gridxy = np.column_stack((xlines * np.array([[step], [y], [0]]),
+                              ylines * np.array([[x], [step], [0]])))
+
+    xlines = lines(x_steps, 'y')
+    zlines = lines(z_steps, 'y')
+    zlines = np.take(zlines, [2,1,0], axis=0)
+    gridxz = np.column_stack((xlines * np.array([[step], [0], [z]]),
+                              zlines * np.array([[x], [0], [step]])))
+
+    return np.column_stack((gridxy, gridxz, gridxz + np.array([[0],[y],[0]]))).transpose()
+
+class TriangulationCache():
+    # Triangulation is done on the profile before transform, rotation and
+    # uniform scale keep the constrained Delaunay triangulation, so moving
+    # a profile only transforms cached vertices. Profiles are keyed by a
+    # hash of their points, most recently used last.
+    def __init__(self, size=8):
+        self.size = size
+        self._cache = collections.OrderedDict()
+
+    def faces(self, profile, tr_mat, y):
+        key = (profile.shape, hashlib.sha1(np.ascontiguousarray(profile)).digest())
+        if key in self._cache:
+            self._cache.move_to_end(key)
+        else:
+            self._cache[key] = triangulate(profile)
+            if len(self._cache) > self.size:
+                self._cache.popitem(last=False)
+        v, f = self._cache[key]
+
+        vertices = np.empty((np.size(v, 0), 3))
+        vertices[:, [0, 2]] = v @ tr_mat[:2, :2].T + tr_mat[:2, 2]
+        vertices[:, 1] = y
+        return vertices, f
+
+class GridCache():
+    # Machine grids keyed by dimensions and step, a few are kept so that
+    # zooming back and forth reuses the same vertex arrays.
+    def __init__(self, size=4):
+        self.size = size
+        self._cache = collections.OrderedDict()
+
+    def grid(self, dimensions, step):
+        key = (tuple(dimensions), step)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+        else:
+            self._cache[key] = machine_grid(*dimensions, step).astype(np.float32)
+            if len(self._cache) > self.size:
+                self._cache.popitem(last=False)
+        return self._cache[key]
+
+def surface_triangles(path_l, path_r):
+    # triangles of the surface swept by the wire, vertices are left path
+    # points followed by right path points
+    n = np.size(path_l, 1)
+    vertices = np.vstack((path_l.transpose(), path_r.transpose()))
+    i = np.arange(n - 1)
+    faces = np.vstack((np.column_stack((i, i + n, i + 1)),
+                       np.column_stack((i + n, i + n + 1, i + 1))))
+    return vertices, faces
@@ -0,0 +1,59 @@
+import os, sys
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'pywing'))
+import cycletime
+
+max_velocity = (6000.0,) * 4
+max_acceleration = (50.0,) * 4
+
+def moves(*points):
+    # XY tower only, UV follows the same path
+    points = np.array(points, dtype=float).transpose()
+    return np.vstack((points, points))
+
+def estimate(positions, feeds, **kwargs):
+    kwargs.setdefault('max_velocity', max_velocity)
+    return cycletime.estimate(positions, np.asarray(feeds, dtype=float), kwargs['max_velocity'], max_acceleration, 0.01, kwargs.get('sections'))
+
+def test_trapezoid():
+    # 10 mm/s reached after 0.2 s and 1 mm, both ways
+    result = estimate(moves((0, 0), (100, 0)), [600.0])
+    assert np.isclose(result['total'], 2 * 0.2 + 98.0 / 10.0)
+    assert result['feed_limited'] > 0.95
+
+def test_triangle():
+    # feedrate is never reached, time is 2 sqrt(L / a)
+    result = estimate(moves((0, 0), (1, 0)), [6000.0])
+    assert np.isclose(result['total'], 2 * np.sqrt(1.0 / 50.0))
+    assert result['feed_limited'] == 0.0
+
+def test_velocity_limit():
+    limited = estimate(moves((0, 0), (100, 0)), [1200.0], max_velocity=(600.0,) * 4)
+    assert np.isclose(limited['total'], estimate(moves((0, 0), (100, 0)), [600.0])['total'])
+
+def test_collinear_junction():
+    # no slow down between aligned moves
+    split = estimate(moves((0, 0), (50, 0), (100, 0)), [600.0, 600.0])
+    assert np.isclose(split['total'], estimate(moves((0, 0), (100, 0)), [600.0])['total'])
+
+def test_corner_junction():
+    # junction speed of a right angle from junction deviation
+    sin_half = np.sqrt(0.5)
+    v = np.sqrt(50.0 * 0.01 * sin_half / (1.0 - sin_half))
+    ramp_up, ramp_down = 100.0 / 100.0, (100.0 - v**2) / 100.0
+    move = 10.0 / 50.0 + (10.0 - v) / 50.0 + (100.0 - ramp_up - ramp_down) / 10.0
+    result = estimate(moves((0, 0), (100, 0), (100, 100)), [600.0, 600.0])
+    assert np.isclose(result['total'], 2 * move)
+
+def test_sections():
+    positions = moves((0, 0), (10, 0), (10, 10), (20, 10), (20, 0))
+    sections = [('lead in', 0, 1), ('profile', 1, 3), ('lead out', 3, 4)]
+    result = estimate(positions, [600.0] * 4, sections=sections)
+    assert set(result['sections']) == {'lead in', 'profile', 'lead out'}
+    assert np.isclose(sum(result['sections'].values()), result['total'])
+    assert np.isclose(result['sections']['profile'], np.sum(result['move_times'][1:3]))
+
+def test_no_move():
+    result = estimate(moves((0, 0), (0, 0)), [600.0])
+    assert result['total'] == 0.0
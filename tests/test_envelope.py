@@ -0,0 +1,61 @@
+import os, sys
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'pywing'))
+import envelope
+
+dimensions = (500.0, 400.0, 300.0)
+
+def machine_paths(x, z, x_r=None, z_r=None):
+    x, z = np.asarray(x, dtype=float), np.asarray(z, dtype=float)
+    x_r = x if x_r is None else np.asarray(x_r, dtype=float)
+    z_r = z if z_r is None else np.asarray(z_r, dtype=float)
+    return np.vstack((x, np.full(x.size, 400.0), z)), np.vstack((x_r, np.zeros(x.size), z_r))
+
+def kinds(issues):
+    return [i.kind for i in issues]
+
+def test_travel_inside():
+    left, right = machine_paths([10, 200, 490], [10, 100, 290])
+    assert envelope.check_travel(left, right, dimensions) == []
+
+def test_travel_out():
+    left, right = machine_paths([10, 200, 510], [10, 100, 290])
+    issues = envelope.check_travel(left, right, dimensions)
+    assert kinds(issues) == [envelope.TRAVEL, envelope.TRAVEL]
+    assert all(i.index == 2 for i in issues)
+    left, right = machine_paths([10, 200, 300], [-1, 100, 290])
+    issues = envelope.check_travel(left, right, dimensions)
+    assert [i.index for i in issues] == [0, 0]
+
+def test_wire_angle():
+    # 100mm offset over 400mm is 14°, 300mm is 37°
+    left, right = machine_paths([100, 300, 0], [0, 0, 0], [0, 0, 0], [0, 0, 0])
+    assert envelope.check_wire_angle(left, right, 30.0)[0].index == 1
+    assert envelope.check_wire_angle(left, right, 40.0) == []
+
+def test_wire_angle_same_y():
+    left = np.array([[10.0], [0.0], [0.0]])
+    right = np.array([[0.0], [0.0], [0.0]])
+    with np.errstate(all='raise'):
+        issues = envelope.check_wire_angle(left, right, 30.0)
+    assert kinds(issues) == [envelope.WIRE_ANGLE]
+
+def with_y(points):
+    points = np.array(points, dtype=float).transpose()
+    return np.vstack((points[0], np.zeros(points.shape[1]), points[1]))
+
+def test_leads_outside():
+    # square profile with leads going away from it
+    path = with_y([(-10, 0), (0, 0), (10, 0), (10, 10), (0, 10), (0, 0), (-10, 0)])
+    assert envelope.check_leads(path, 'left') == []
+
+def test_lead_crossing_profile():
+    # lead in goes through the square to reach its first point
+    path = with_y([(20, 0), (0, 0), (0, 10), (10, 10), (10, -5), (0, -5), (-10, -5)])
+    issues = envelope.check_leads(path, 'left')
+    assert kinds(issues) == [envelope.COLLISION]
+    assert issues[0].index == 0
+
+def test_check_empty():
+    assert envelope.check(np.zeros((3, 0)), np.zeros((3, 0)), np.zeros((3, 0)), np.zeros((3, 0)), dimensions, 30.0) == []
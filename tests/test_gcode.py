@@ -0,0 +1,43 @@
+import os, sys
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'pywing'))
+import gcode
+
+max_velocity = np.array((6000.0,) * 4)
+
+def line(n, dx=1.0, dy=0.0):
+    # n moves of both towers along the same direction
+    steps = np.arange(n + 1, dtype=float)
+    return np.vstack((steps * dx, steps * dy, steps * dx, steps * dy))
+
+def test_feedrate_kept_exact():
+    for feedrate in (100.0, 200.0, 333.0):
+        feeds = gcode.plan_feeds(line(3), np.full(3, feedrate), feedrate, max_velocity)
+        assert np.all(feeds == feedrate)
+
+def test_quantization():
+    feeds = gcode.plan_feeds(line(3), np.array([203.0, 205.0, 207.0]), 200.0, max_velocity, max_change=1.0)
+    # rounded down to steps of 1% of feedrate
+    assert np.all(feeds <= [203.0, 205.0, 207.0])
+    assert np.all(feeds >= np.array([203.0, 205.0, 207.0]) / 1.01)
+    steps = np.log(feeds / 200.0) / np.log1p(gcode.feed_quantum)
+    assert np.allclose(steps, np.round(steps))
+
+def test_clamping():
+    # diagonal moves, each axis at max velocity gives sqrt(2) times faster feed
+    limit = np.array((600.0,) * 4)
+    feeds = gcode.plan_feeds(line(3, 1.0, 1.0), np.full(3, 2000.0), 2000.0, limit)
+    assert np.all(feeds <= 600.0 * np.sqrt(2.0))
+    assert np.all(feeds >= 600.0 * np.sqrt(2.0) / 1.01)
+
+def test_smoothing():
+    feeds = gcode.plan_feeds(line(5), np.array([200.0, 200.0, 1000.0, 200.0, 200.0]), 200.0, max_velocity)
+    assert np.all(feeds[1:] / feeds[:-1] <= 1.0 + gcode.feed_max_change + 1e-9)
+    assert np.all(feeds[:-1] / feeds[1:] <= 1.0 + gcode.feed_max_change + 1e-9)
+    assert 250.0 / 1.01 <= feeds[2] <= 250.0 + 1e-9
+
+def test_moves_without_displacement():
+    positions = np.column_stack((line(1), line(1)[:, -1:], line(2)[:, -1:]))
+    feeds = gcode.plan_feeds(positions, np.array([200.0, 0.0, 200.0]), 200.0, max_velocity)
+    assert np.all(feeds == 200.0)
@@ -0,0 +1,58 @@
+import os, sys
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'pywing'))
+import nesting
+
+def square(size, lead=5.0):
+    # closed square with its lead ends on the left of the bottom edge
+    return np.array([[-lead, 0.0, size, size, 0.0, 0.0, -lead],
+                     [0.0, 0.0, 0.0, size, size, 0.0, 0.0]])
+
+def part(size_l, size_r):
+    face_l, face_r = square(size_l), square(size_r)
+    positions = np.vstack((face_l, face_r))
+    return nesting.Part(positions, np.full(np.size(positions, 1) - 1, 200.0), (face_l, face_r))
+
+def placed_boxes(n):
+    # bounds of each placed part over both faces as (min, max)
+    boxes = list()
+    for p, o in zip(n.parts, n.offsets):
+        points = np.hstack(p.faces) + o.reshape(2, 1)
+        boxes.append((np.amin(points, axis=1), np.amax(points, axis=1)))
+    return boxes
+
+def check_placement(n):
+    block = np.array(n.block)
+    boxes = placed_boxes(n)
+    for low, high in boxes:
+        assert np.all(low >= block[:2] - 1e-9)
+        assert np.all(high <= block[:2] + block[2:] + 1e-9)
+    for i, (low_a, high_a) in enumerate(boxes):
+        for low_b, high_b in boxes[i + 1:]:
+            gap = np.maximum(np.maximum(low_b - high_a, low_a - high_b), 0.0)
+            assert np.hypot(*gap) >= n.spacing - 1e-9
+
+def test_place_outline():
+    n = nesting.Nesting((10.0, 20.0, 200.0, 100.0), step=2.0, spacing=5.0)
+    n.place([part(30.0, 30.0) for i in range(5)])
+    check_placement(n)
+
+def test_place_box():
+    n = nesting.Nesting((0.0, 0.0, 200.0, 100.0), step=2.0, spacing=5.0)
+    n.place([part(30.0, 30.0) for i in range(5)], 'box')
+    check_placement(n)
+
+def test_place_tapered():
+    n = nesting.Nesting((0.0, 0.0, 200.0, 100.0), step=2.0, spacing=8.0)
+    n.place([part(40.0, 20.0), part(20.0, 40.0), part(30.0, 10.0), part(25.0, 25.0)])
+    check_placement(n)
+
+def test_place_no_room():
+    n = nesting.Nesting((0.0, 0.0, 100.0, 50.0), step=2.0, spacing=5.0)
+    try:
+        n.place([part(30.0, 30.0) for i in range(6)])
+    except ValueError:
+        pass
+    else:
+        assert False, 'parts should not fit in block'
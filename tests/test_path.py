@@ -0,0 +1,19 @@
+import os, sys
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'pywing'))
+import path
+
+def test_leads():
+    points = np.array([[0.0, 10.0, 20.0], [0.0, 0.0, 0.0]])
+    result = path.with_leads(points, 5.0)
+    assert np.allclose(result[:, 0], (-5.0, 0.0))
+    assert np.allclose(result[:, -1], (25.0, 0.0))
+
+def test_lead_on_degenerate_path():
+    try:
+        path.with_leads(np.zeros((2, 3)), 10.0)
+    except ValueError:
+        pass
+    else:
+        assert False, 'a path without length has no lead direction'
@@ -0,0 +1,34 @@
+import os, sys
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'pywing'))
+from pathgenerator import PathGenerator, Line
+
+def test_features_single_segment():
+    gen = PathGenerator([Line((0, 0), (10, 0))])
+    assert gen.features()['curvature_extrema'].size == 0
+    assert gen.auto_sync_points() == []
+
+def test_features_two_segments():
+    gen = PathGenerator([Line((0, 0), (10, 0)), Line((10, 0), (10, 10))])
+    assert gen.features()['curvature_extrema'].size == 0
+    assert np.allclose(gen.auto_sync_points(), [0.5])
+
+def polygon(points):
+    return PathGenerator([Line(a, b) for a, b in zip(points, points[1:] + points[:1])])
+
+def test_auto_sync_pair_drops_unmatched_corner():
+    square = polygon([(0, 0), (10, 0), (10, 10), (0, 10)])
+    house = polygon([(0, 0), (10, 0), (10, 10), (5, 12), (0, 10)])
+    sync_a, sync_b = PathGenerator.auto_sync_pair(square, house)
+    assert len(sync_a) == len(sync_b) == 3
+    # every pair is the same corner of both shapes
+    for a, b in zip(sync_a, sync_b):
+        assert np.allclose(square.get_point(a), house.get_point(b))
+
+def test_auto_sync_pair_same_order():
+    a = polygon([(0, 0), (10, 0), (10, 10), (0, 10)])
+    b = polygon([(0, 0), (20, 0), (20, 10), (0, 10)])
+    sync_a, sync_b = PathGenerator.auto_sync_pair(a, b)
+    assert len(sync_a) == len(sync_b)
+    assert np.all(np.diff(sync_a) > 0) and np.all(np.diff(sync_b) > 0)
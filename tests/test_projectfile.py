@@ -0,0 +1,70 @@
+import os, sys, pickle
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'pywing'))
+from pathgenerator import PathGenerator, Line, Arc
+from path import Path
+from projectfile import ProjectFile
+
+def make_state():
+    gen_l = PathGenerator([Line((0, 0), (10, 0)), Arc((10, 5), 5.0, -np.pi / 2, np.pi / 2, True), Line((10, 10), (0, 10))])
+    gen_l.sync_points = [0.25, 0.75]
+    gen_r = PathGenerator([Line((0, 0), (20, 0)), Line((20, 0), (20, 10))])
+    gen_rib = PathGenerator([Line((0, 0), (15, 0)), Line((15, 0), (15, 10))])
+    path_l, path_r, path_rib = Path(), Path(), Path()
+    path_l.scale(2.0)
+    path_l.set_kerf_width(0.4)
+    path_rib.scale(1.5)
+    return (False, (300.0, 10.0), (50.0, 400.0), ('Absolute', 2.0, [100.0, 5.0]), ('Relative', 0.5, [1.0, 2.0]),
+            (path_l, gen_l, 'left.dat', (255, 0, 0), True, 0.1),
+            (path_r, gen_r, 'right.dxf', (0, 0, 255), False, 0.0),
+            [((path_rib, gen_rib, 'rib.dat', (0, 160, 0), True, 0.0), 0.4)])
+
+def check_path(p, e):
+    path, gen, name, color, loaded, shift = p
+    e_path, e_gen, e_name, e_color, e_loaded, e_shift = e
+    assert (path.s, path.k) == (e_path.s, e_path.k)
+    assert (name, tuple(color), loaded, shift) == (e_name, tuple(e_color), e_loaded, e_shift)
+    assert list(gen.sync_points) == list(e_gen.sync_points)
+    assert np.allclose(gen.generate(), e_gen.generate())
+
+def check_state(state, expected):
+    assert state[0] == expected[0]
+    for i in range(1, 5):
+        assert tuple(state[i]) == tuple(expected[i])
+    check_path(state[5], expected[5])
+    check_path(state[6], expected[6])
+    assert len(state[7]) == len(expected[7])
+    for (rib, position), (e_rib, e_position) in zip(state[7], expected[7]):
+        check_path(rib, e_rib)
+        assert position == e_position
+
+def test_round_trip(tmp_path):
+    filename = str(tmp_path / 'project.pw')
+    state = make_state()
+    ProjectFile.save(filename, state)
+    check_state(ProjectFile.load(filename), state)
+
+def test_legacy_pickle(tmp_path):
+    filename = str(tmp_path / 'legacy.pw')
+    # legacy projects have no ribs
+    state = make_state()[:7] + ([],)
+    with open(filename, 'wb') as fp:
+        for i in state[:7]:
+            pickle.dump(i, fp)
+    loaded = ProjectFile.load(filename)
+    check_state(loaded, state)
+    # migrated paths are new objects
+    assert loaded[5][0] is not state[5][0]
+
+def test_newer_version(tmp_path):
+    filename = str(tmp_path / 'project.pw')
+    ProjectFile.save(filename, make_state())
+    with open(filename, 'r+b') as fp:
+        fp.write(ProjectFile.prefix.pack(ProjectFile.magic, ProjectFile.version + 1, 0))
+    try:
+        ProjectFile.load(filename)
+    except ValueError:
+        pass
+    else:
+        assert False, 'newer version should be rejected'
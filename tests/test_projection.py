@@ -0,0 +1,47 @@
+import os, sys
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'pywing'))
+import projection
+
+def raises(function, *args):
+    try:
+        function(*args)
+    except ValueError:
+        return True
+    return False
+
+def test_default_towers():
+    left = projection.to_3d(np.array([[10.0, 20.0], [5.0, 5.0]]), 300.0)
+    right = projection.to_3d(np.array([[0.0, 20.0], [5.0, 15.0]]), 100.0)
+    at_l, at_r = projection.project(left, right, projection.towers(400.0))
+    # wire lines extended to Y = 400 and Y = 0
+    assert np.allclose(at_l, [[15.0, 20.0], [400.0, 400.0], [5.0, 0.0]])
+    assert np.allclose(at_r, [[-5.0, 20.0], [0.0, 0.0], [5.0, 20.0]])
+
+def test_tilted_plane():
+    planes = (projection.plane((0.0, 100.0, 0.0), (1.0, 1.0, 0.0)),)
+    left = np.array([[0.0], [50.0], [0.0]])
+    right = np.array([[0.0], [0.0], [0.0]])
+    point, = projection.project(left, right, planes)
+    assert np.allclose(point[:, 0], (0.0, 100.0, 0.0))
+
+def test_zero_normal():
+    assert raises(projection.plane, (0.0, 0.0, 0.0), (0.0, 0.0, 0.0))
+
+def test_equal_points():
+    point = np.array([[1.0], [2.0], [3.0]])
+    assert raises(projection.project, point, point, projection.towers(100.0))
+
+def test_wire_parallel_to_plane():
+    left = np.array([[0.0], [0.0], [0.0]])
+    right = np.array([[10.0], [0.0], [0.0]])
+    assert raises(projection.project, left, right, projection.towers(100.0))
+
+def test_shape_mismatch():
+    assert raises(projection.project, np.zeros((3, 2)), np.zeros((3, 3)), projection.towers(100.0))
+    assert raises(projection.project, np.zeros((2, 2)), np.zeros((2, 2)), projection.towers(100.0))
+
+def test_empty_paths():
+    at_l, at_r = projection.project(np.zeros((3, 0)), np.zeros((3, 0)), projection.towers(100.0))
+    assert at_l.shape == at_r.shape == (3, 0)